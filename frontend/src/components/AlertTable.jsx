@@ -5,6 +5,8 @@ const AlertTable = () => {
   const [alerts, setAlerts] = useState([]);
   const [pagination, setPagination] = useState({ total: 0, page: 1, per_page: 20, pages: 1 });
   const [currentPage, setCurrentPage] = useState(1);
+  // cursors[i] is the keyset cursor that fetches page i + 1 (page 1 starts at the newest alert)
+  const [cursors, setCursors] = useState([null]);
   const [loading, setLoading] = useState(false);
   const BASE_URL = "http://34.222.107.115:8000/api";
 
@@ -14,12 +16,20 @@ const AlertTable = () => {
 const fetchAlerts = async (page = 1) => {
   setLoading(true);
   try {
+    const cursor = cursors[page - 1];
     const res = await axios.get(`${BASE_URL}/live_threats`, {
-      params: { page, per_page: pagination.per_page },
+      params: { limit: pagination.per_page, ...(cursor ? { cursor } : {}) },
     });
     const data = res.data || {};
     const fetchedAlerts = data.malicious_ips || []; // fallback to empty array
-    const total = data.total || fetchedAlerts.length; // fallback if backend doesn't send total
+    const total = data.total ?? fetchedAlerts.length; // total is null when it would need a full scan
+    if (data.next_cursor) {
+      setCursors((prev) => {
+        const next = prev.slice(0, page);
+        next[page] = data.next_cursor;
+        return next;
+      });
+    }
 
     setAlerts(fetchedAlerts);
     setPagination((prev) => ({
@@ -37,7 +47,7 @@ const fetchAlerts = async (page = 1) => {
 };
 
   const handlePageChange = (page) => {
-    if (page >= 1 && page <= pagination.pages) {
+    if (page >= 1 && page <= pagination.pages && cursors[page - 1] !== undefined) {
       setCurrentPage(page);
     }
   };
@@ -49,7 +59,8 @@ const fetchAlerts = async (page = 1) => {
     const totalPages = pagination.pages;
     const pageNumbers = [];
     let start = Math.max(1, currentPage - 2);
-    let end = Math.min(totalPages, start + 4);
+    // Only pages whose cursor is known can be jumped to
+    let end = Math.min(totalPages, cursors.length, start + 4);
     start = Math.max(1, end - 4);
 
     for (let i = start; i <= end; i++) {
@@ -154,7 +165,7 @@ const fetchAlerts = async (page = 1) => {
             {renderPageNumbers()}
             <button
               onClick={() => handlePageChange(currentPage + 1)}
-              disabled={currentPage >= pagination.pages}
+              disabled={currentPage >= pagination.pages || cursors[currentPage] === undefined}
               className="px-3 py-1 border rounded text-sm font-medium bg-white text-gray-700 hover:bg-gray-100 disabled:opacity-50"
             >
               Next
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from "react";
 import axios from "axios";
+import { subscribeEvents } from "../services/websocket";
 
 const BlockedIPs = () => {
   const [blockedIPs, setBlockedIPs] = useState([]);
@@ -11,8 +12,8 @@ const BlockedIPs = () => {
 
   useEffect(() => {
     fetchBlockedIPs();
-    const interval = setInterval(fetchBlockedIPs, 10000);
-    return () => clearInterval(interval);
+    // Refresh when the blocklist changes instead of polling
+    return subscribeEvents({ topics: ["block", "unblock"] }, fetchBlockedIPs);
   }, [currentPage]);
 
   const fetchBlockedIPs = async () => {
@@ -3,6 +3,7 @@ import { MapContainer, TileLayer, Marker, Popup, Circle } from "react-leaflet";
 import "leaflet/dist/leaflet.css";
 import L from "leaflet";
 import toast, { Toaster } from "react-hot-toast";
+import { subscribeEvents, throttle } from "../services/websocket";
 
 // Fix for default markers in react-leaflet
 delete L.Icon.Default.prototype._getIconUrl;
@@ -180,12 +181,12 @@ const RealTimeRiskMap = () => {
 
   useEffect(() => {
     if (autoRefresh) {
-      const interval = setInterval(() => {
-        console.log("Auto-refresh triggered");
+      // Refetch when risk scores change, at most every 5 seconds
+      const refresh = throttle(() => {
         fetchRiskData();
         fetchStatistics();
-      }, 10000);
-      return () => clearInterval(interval);
+      }, 5000);
+      return subscribeEvents({ topics: ["risk"] }, refresh);
     }
   }, [autoRefresh]);
 
@@ -39,17 +39,31 @@ const SuricataDashboard = () => {
     }
   };
 
+  // Start/stop and rule updates run as background jobs on the server; poll until one finishes.
+  const waitForJob = async (response) => {
+    if (response.status !== 202) return response.data;
+    const jobId = response.data.job_id;
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const { data: job } = await axios.get(`${BASE_URL}/jobs/${jobId}`);
+      if (job.status === "succeeded") return { status: "success", message: job.result?.message };
+      if (job.status === "failed") return { status: "error", message: job.error };
+    }
+  };
+
   const handleStartSuricata = async () => {
     setLoading(true);
     try {
-      const response = await axios.post(`${BASE_URL}/suricata/start`, {
-        interface: selectedInterface,
-      });
-      if (response.data.status === "success") {
+      const result = await waitForJob(
+        await axios.post(`${BASE_URL}/suricata/start`, {
+          interface: selectedInterface,
+        })
+      );
+      if (result.status === "success") {
         alert("Suricata started successfully!");
         fetchSuricataData();
       } else {
-        alert(`Failed to start Suricata: ${response.data.message}`);
+        alert(`Failed to start Suricata: ${result.message}`);
       }
     } catch (error) {
       console.error("Error starting Suricata:", error.response?.data || error.message);
@@ -61,12 +75,12 @@ const SuricataDashboard = () => {
   const handleStopSuricata = async () => {
     setLoading(true);
     try {
-      const response = await axios.post(`${BASE_URL}/suricata/stop`);
-      if (response.data.status === "success") {
+      const result = await waitForJob(await axios.post(`${BASE_URL}/suricata/stop`));
+      if (result.status === "success") {
         alert("Suricata stopped successfully!");
         fetchSuricataData();
       } else {
-        alert(`Failed to stop Suricata: ${response.data.message}`);
+        alert(`Failed to stop Suricata: ${result.message}`);
       }
     } catch (error) {
       console.error("Error stopping Suricata:", error.response?.data || error.message);
@@ -78,11 +92,11 @@ const SuricataDashboard = () => {
   const handleUpdateRules = async () => {
     setLoading(true);
     try {
-      const response = await axios.post(`${BASE_URL}/suricata/rules/update`);
-      if (response.data.status === "success") {
+      const result = await waitForJob(await axios.post(`${BASE_URL}/suricata/rules/update`));
+      if (result.status === "success") {
         alert("Suricata rules updated successfully!");
       } else {
-        alert(`Rules update result: ${response.data.message}`);
+        alert(`Rules update result: ${result.message}`);
       }
     } catch (error) {
       console.error("Error updating rules:", error.response?.data || error.message);
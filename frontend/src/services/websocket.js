@@ -1 +1,60 @@
-// Placeholder for WebSocket helpers
+// Push channel for alerts, block/unblock, risk and health events (/ws/events)
+const WS_URL = "ws://34.222.107.115:8000/ws/events";
+const MAX_RETRY_DELAY = 30000;
+
+// Calls onEvents with each batch of events matching the filters and reconnects
+// with backoff when the connection drops. Returns a function that closes it.
+export const subscribeEvents = ({ topics, ips, maxSeverity } = {}, onEvents) => {
+  const params = new URLSearchParams();
+  if (topics) params.set("topics", topics.join(","));
+  if (ips) params.set("ips", ips.join(","));
+  if (maxSeverity != null) params.set("max_severity", maxSeverity);
+
+  let socket = null;
+  let retryDelay = 1000;
+  let retryTimer = null;
+  let closed = false;
+
+  const connect = () => {
+    socket = new WebSocket(`${WS_URL}?${params.toString()}`);
+    socket.onopen = () => {
+      retryDelay = 1000;
+    };
+    socket.onmessage = (message) => {
+      const events = JSON.parse(message.data);
+      if (events.length) onEvents(events);
+    };
+    socket.onclose = () => {
+      if (closed) return;
+      retryTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+    };
+    socket.onerror = () => socket.close();
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    if (socket) socket.close();
+  };
+};
+
+// Calls fn at most once per interval ms, trailing calls included
+export const throttle = (fn, interval) => {
+  let last = 0;
+  let timer = null;
+  return (...args) => {
+    const wait = last + interval - Date.now();
+    if (wait <= 0) {
+      last = Date.now();
+      fn(...args);
+    } else if (!timer) {
+      timer = setTimeout(() => {
+        timer = null;
+        last = Date.now();
+        fn(...args);
+      }, wait);
+    }
+  };
+};
@@ -0,0 +1,447 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+NO_VALUE = -1
+NO_TIME = 0
+# Rows older than the newest timestamp seen so far by more than this are
+# tracked separately so time windows stay exact under out-of-order arrival.
+LATE_TOLERANCE = 60 * 1_000_000
+
+# (column name, array typecode); string columns hold codes into a StringTable.
+NUMERIC_COLUMNS = [
+    ("timestamp", "q"),
+    ("src_port", "i"),
+    ("dest_port", "i"),
+    ("severity", "h"),  # Suricata priorities go up to 255
+    ("signature_id", "q"),
+]
+STRING_COLUMNS = ["src_ip", "dest_ip", "proto", "attack_type", "category", "country"]
+ROW_FIELDS = [name for name, _ in NUMERIC_COLUMNS] + STRING_COLUMNS + ["anomaly"]
+# Rows a single page may examine before it returns early with a cursor.
+MAX_SCAN = 100_000
+ROW_BYTES = (
+    sum(array(code).itemsize for _, code in NUMERIC_COLUMNS)
+    + array("I").itemsize * len(STRING_COLUMNS)
+    + array("q").itemsize  # watermark
+    + 2 * array("q").itemsize  # src/dest postings in the IP index
+)
+
+
+def parse_timestamp(value: Optional[str]) -> int:
+    """Suricata timestamp -> epoch microseconds (NO_TIME if missing or unparsable)."""
+    if not value:
+        return NO_TIME
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            dt = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z")
+        except ValueError:
+            print(f"Error parsing timestamp {value}")
+            return NO_TIME
+    return epoch_micros(dt)
+
+
+def epoch_micros(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def format_timestamp(micros: int) -> str:
+    if micros == NO_TIME:
+        return ""
+    return (EPOCH + timedelta(microseconds=micros)).strftime("%Y-%m-%dT%H:%M:%S.%f+0000")
+
+
+class StringTable:
+    """Dictionary encoding for repetitive strings; code 0 is reserved for None."""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self.codes.get(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class PostingIndex:
+    """Maps a string code to the ascending seqs of the rows that contain it.
+
+    Evictions always remove the oldest live seq, so they only ever pop from the
+    head of a posting list; the head offset is advanced and the array is
+    compacted once the dead prefix dominates.
+    """
+
+    def __init__(self):
+        self._postings: Dict[int, List] = {}  # code -> [array of seqs, head offset]
+
+    def add(self, code: int, seq: int):
+        entry = self._postings.get(code)
+        if entry is None:
+            self._postings[code] = [array("q", [seq]), 0]
+        else:
+            entry[0].append(seq)
+
+    def evict(self, code: int, seq: int):
+        entry = self._postings.get(code)
+        if entry is None:
+            return
+        seqs, head = entry
+        if head < len(seqs) and seqs[head] == seq:
+            head += 1
+        if head == len(seqs):
+            del self._postings[code]
+        elif head > 1024 and head * 2 > len(seqs):
+            del seqs[:head]
+            entry[1] = 0
+        else:
+            entry[1] = head
+
+    def get(self, code: int) -> List[int]:
+        entry = self._postings.get(code)
+        if entry is None:
+            return []
+        seqs, head = entry
+        return seqs[head:].tolist()
+
+    def descending(self, code: int, below: int) -> Iterator[int]:
+        """Seqs containing ``code`` that are < ``below``, newest first."""
+        entry = self._postings.get(code)
+        if entry is None:
+            return iter(())
+        seqs, head = entry
+        end = bisect_left(seqs, below, head)
+        return (seqs[i] for i in range(end - 1, head - 1, -1))
+
+    def count(self, code: int) -> int:
+        entry = self._postings.get(code)
+        return len(entry[0]) - entry[1] if entry else 0
+
+    def codes(self) -> List[int]:
+        return list(self._postings)
+
+
+class AlertStore:
+    """Columnar ring buffer of Suricata alerts, capped at ``max_bytes`` of column data.
+
+    Every ingested alert gets a monotonically increasing sequence number; the row
+    for ``seq`` lives at ``seq % capacity`` until it is overwritten, so once the
+    cap is reached the oldest alerts are evicted first. IPs share one string
+    table so src and dest codes are comparable.
+
+    Timestamps are parsed once at ingest. Alongside them the store keeps a
+    watermark column (running maximum timestamp), which is non-decreasing in
+    seq order and therefore binary-searchable; the few rows that arrive more
+    than LATE_TOLERANCE behind the watermark are listed in ``late_seqs``.
+
+    ``ip_index`` is an inverted index from IP code to the seqs of every alert
+    that has it as source or destination, maintained on ingest and eviction.
+    ``on_evict`` is called with the seq of a row just before it is overwritten.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, on_evict: Optional[Callable[[int], None]] = None):
+        self.capacity = max(max_bytes // ROW_BYTES, 1)
+        self.on_evict = on_evict
+        self.ips = StringTable()
+        self.tables = {
+            "src_ip": self.ips,
+            "dest_ip": self.ips,
+            "proto": StringTable(),
+            "attack_type": StringTable(),
+            "category": StringTable(),
+            "country": StringTable(),
+        }
+        self.columns = {name: array(code) for name, code in NUMERIC_COLUMNS}
+        self.columns.update({name: array("I") for name in STRING_COLUMNS})
+        self.watermark = array("q")
+        self.late_seqs = array("q")
+        self.ip_index = PostingIndex()
+        self.next_seq = 0
+        self.lock = threading.RLock()
+
+    @property
+    def first_seq(self) -> int:
+        return max(self.next_seq - self.capacity, 0)
+
+    def __len__(self) -> int:
+        return self.next_seq - self.first_seq
+
+    def append(self, alert: Dict) -> int:
+        """Store one alert (keys as in ``STRING_COLUMNS``/``NUMERIC_COLUMNS``; timestamp as a string)."""
+        with self.lock:
+            seq = self.next_seq
+            # Every value is checked against its column's typecode before any state
+            # changes, so a bad field cannot leave the columns misaligned
+            values = {name: _int_or_none(alert.get(name), code) for name, code in NUMERIC_COLUMNS if name != "timestamp"}
+            values["timestamp"] = parse_timestamp(alert.get("timestamp"))
+            for name in STRING_COLUMNS:
+                values[name] = self.tables[name].encode(alert.get(name))
+            high = values["timestamp"]
+            if seq:
+                previous = self.watermark[(seq - 1) % self.capacity]
+                if high < previous - LATE_TOLERANCE:
+                    self.late_seqs.append(seq)
+                high = max(high, previous)
+            if seq < self.capacity:
+                for name, column in self.columns.items():
+                    column.append(values[name])
+                self.watermark.append(high)
+            else:
+                pos = seq % self.capacity
+                oldest = seq + 1 - self.capacity
+                if self.on_evict is not None:
+                    self.on_evict(oldest - 1)
+                self._unindex(oldest - 1, self.columns["src_ip"][pos], self.columns["dest_ip"][pos])
+                for name, column in self.columns.items():
+                    column[pos] = values[name]
+                self.watermark[pos] = high
+                if self.late_seqs and self.late_seqs[0] < oldest:
+                    del self.late_seqs[:bisect_left(self.late_seqs, oldest)]
+            self.ip_index.add(values["src_ip"], seq)
+            if values["dest_ip"] != values["src_ip"]:
+                self.ip_index.add(values["dest_ip"], seq)
+            self.next_seq = seq + 1
+            return seq
+
+    def _unindex(self, seq: int, src: int, dest: int):
+        self.ip_index.evict(src, seq)
+        if dest != src:
+            self.ip_index.evict(dest, seq)
+
+    def extend(self, alerts: Iterable[Dict]):
+        with self.lock:
+            for alert in alerts:
+                self.append(alert)
+
+    def value(self, name: str, seq: int):
+        return self.columns[name][seq % self.capacity]
+
+    def row(self, seq: int) -> Dict:
+        pos = seq % self.capacity
+        row = {}
+        for name, _ in NUMERIC_COLUMNS:
+            value = self.columns[name][pos]
+            row[name] = None if value == NO_VALUE else value
+        row["timestamp"] = format_timestamp(self.columns["timestamp"][pos])
+        for name in STRING_COLUMNS:
+            row[name] = self.tables[name].values[self.columns[name][pos]]
+        row["anomaly"] = None
+        return row
+
+    def project(self, seq: int, fields: Iterable[str]) -> Dict:
+        """Only the requested ``ROW_FIELDS`` of a row."""
+        pos = seq % self.capacity
+        row = {}
+        for name in fields:
+            if name == "timestamp":
+                row[name] = format_timestamp(self.columns[name][pos])
+            elif name in self.tables:
+                row[name] = self.tables[name].values[self.columns[name][pos]]
+            elif name == "anomaly":
+                row[name] = None
+            else:
+                value = self.columns[name][pos]
+                row[name] = None if value == NO_VALUE else value
+        return row
+
+    def seqs(self, newest_first: bool = True) -> range:
+        with self.lock:
+            if newest_first:
+                return range(self.next_seq - 1, self.first_seq - 1, -1)
+            return range(self.first_seq, self.next_seq)
+
+    def latest(self, limit: Optional[int] = None) -> List[Dict]:
+        """Decoded rows, newest first."""
+        with self.lock:
+            seqs = self.seqs()
+            return self.rows(seqs[:limit] if limit else seqs)
+
+    def rows(self, seqs: Iterable[int]) -> List[Dict]:
+        with self.lock:
+            return [self.row(seq) for seq in seqs]
+
+    def ip_seqs(self, ip: str) -> List[int]:
+        """Seqs of live alerts with ``ip`` as source or destination, oldest first."""
+        with self.lock:
+            code = self.ips.lookup(ip)
+            return [] if code is None else self.ip_index.get(code)
+
+    def ip_count(self, ip: str) -> int:
+        with self.lock:
+            code = self.ips.lookup(ip)
+            return 0 if code is None else self.ip_index.count(code)
+
+    def page(
+        self,
+        before: Optional[int] = None,
+        limit: int = 100,
+        ip: Optional[str] = None,
+        src_ip: Optional[str] = None,
+        dest_ip: Optional[str] = None,
+        signature: Optional[str] = None,
+        severity: Optional[int] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        max_scan: int = MAX_SCAN,
+    ) -> Tuple[List[int], Optional[int]]:
+        """Keyset page: up to ``limit`` matching seqs below the cursor ``before``, newest first.
+
+        Returns the seqs and the cursor for the next page (None when there
+        are no older rows). The scan starts at the cursor rather than
+        counting from the newest row: an IP filter walks that IP's posting
+        list, ``end`` is located by binary search on the watermark, and the
+        walk stops at the first watermark below ``start``. A page examines at
+        most ``max_scan`` rows; if that runs out it is returned short, with a
+        cursor to continue from.
+        """
+        with self.lock:
+            top = self.next_seq if before is None else min(before, self.next_seq)
+            checks = []
+            for name, value in (("ip", ip), ("src_ip", src_ip), ("dest_ip", dest_ip), ("attack_type", signature)):
+                if value is None:
+                    continue
+                code = self.tables["src_ip" if name == "ip" else name].lookup(value)
+                if code is None:
+                    return [], None
+                checks.append((name, code))
+            if severity is not None:
+                checks.append(("severity", severity))
+
+            indexed = next(((name, code) for name, code in checks if name in ("ip", "src_ip", "dest_ip")), None)
+            if indexed is not None:
+                candidates = self.ip_index.descending(indexed[1], top)
+                if indexed[0] == "ip":
+                    checks.remove(indexed)  # the posting list already matches src or dest
+            elif end is not None:
+                # Past this point only rows in late_seqs can still be older than end
+                hi = min(top, self._bisect_watermark(end + LATE_TOLERANCE))
+                late = self.late_seqs[bisect_left(self.late_seqs, hi):bisect_left(self.late_seqs, top)]
+                candidates = chain(reversed(late), range(hi - 1, self.first_seq - 1, -1))
+            else:
+                candidates = range(top - 1, self.first_seq - 1, -1)
+
+            columns, capacity = self.columns, self.capacity
+            timestamps = columns["timestamp"]
+            result, scanned = [], 0
+            for seq in candidates:
+                if seq < self.first_seq:
+                    break
+                pos = seq % capacity
+                # The watermark never decreases with seq, so nothing older can match
+                if start is not None and self.watermark[pos] < start:
+                    break
+                scanned += 1
+                if (
+                    (start is None or timestamps[pos] >= start)
+                    and (end is None or timestamps[pos] < end)
+                    and all(
+                        columns["src_ip"][pos] == code or columns["dest_ip"][pos] == code if name == "ip"
+                        else columns[name][pos] == code
+                        for name, code in checks
+                    )
+                ):
+                    result.append(seq)
+                    if len(result) == limit:
+                        return result, seq
+                if scanned >= max_scan:
+                    return result, seq
+            return result, None
+
+    def indexed_ips(self) -> List[str]:
+        with self.lock:
+            return [self.ips.values[code] for code in self.ip_index.codes() if code]
+
+    def _bisect_watermark(self, micros: int) -> int:
+        """First live seq whose watermark is >= micros."""
+        lo, hi = self.first_seq, self.next_seq
+        watermark, capacity = self.watermark, self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if watermark[mid % capacity] < micros:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, start: int, end: Optional[int] = None) -> List[int]:
+        """Seqs of alerts with start <= timestamp < end (epoch microseconds), oldest first."""
+        with self.lock:
+            # Every row before the first watermark >= start is older than start.
+            lo = self._bisect_watermark(start)
+            if end is None:
+                hi, late = self.next_seq, []
+            else:
+                # Past this point only rows in late_seqs can still be older than end.
+                hi = self._bisect_watermark(end + LATE_TOLERANCE)
+                late = self.late_seqs[bisect_left(self.late_seqs, hi):]
+            timestamps, capacity = self.columns["timestamp"], self.capacity
+            seqs = [seq for seq in range(lo, hi) if timestamps[seq % capacity] >= start]
+            if end is not None:
+                seqs = [seq for seq in seqs if timestamps[seq % capacity] < end]
+                seqs += [seq for seq in late if start <= timestamps[seq % capacity] < end]
+            return seqs
+
+    def latest_in_window(self, start: int, limit: int) -> List[int]:
+        """Up to ``limit`` seqs with timestamp >= start, newest first."""
+        result = []
+        with self.lock:
+            timestamps, capacity = self.columns["timestamp"], self.capacity
+            for seq in range(self.next_seq - 1, self.first_seq - 1, -1):
+                if self.watermark[seq % capacity] < start:
+                    break
+                if timestamps[seq % capacity] >= start:
+                    result.append(seq)
+                    if len(result) == limit:
+                        break
+        return result
+
+    def count_by(self, name: str, seqs: Optional[Iterable[int]] = None) -> Counter:
+        """Counter of decoded values of a string column, aggregated on codes."""
+        with self.lock:
+            column = self.columns[name]
+            if seqs is None:
+                # Every slot of the ring holds a live row.
+                codes = Counter(column)
+            else:
+                capacity = self.capacity
+                codes = Counter(column[seq % capacity] for seq in seqs)
+            values = self.tables[name].values
+            return Counter({values[code]: count for code, count in codes.items()})
+
+    def memory_usage(self) -> Tuple[int, int]:
+        """(bytes used by column data, configured cap in bytes)."""
+        used = sum(column.itemsize * len(column) for column in self.columns.values())
+        used += self.watermark.itemsize * len(self.watermark)
+        return used, self.capacity * ROW_BYTES
+
+
+def _int_or_none(value, code: str = "q") -> int:
+    """``value`` as an int that fits array typecode ``code``, else NO_VALUE."""
+    if value is None:
+        return NO_VALUE
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return NO_VALUE
+    limit = 1 << (8 * array(code).itemsize - 1)
+    return value if -limit <= value < limit else NO_VALUE
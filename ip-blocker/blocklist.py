@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+import argparse
+import fcntl
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from firewall import AI_BLOCK_FILE, parse_entry
+
+COMPACT_THRESHOLD = 1000  # journal records before the snapshot is rewritten
+COMPACT_INTERVAL = 60  # seconds a non-empty journal may wait for compaction
+
+
+class BlocklistStore:
+    """ai_block.txt as an in-memory ordered set, persisted through an append-only journal.
+
+    ``path`` is the snapshot (one entry per line, readable by the shell
+    scripts); changes are appended as ``+entry``/``-entry`` lines to
+    ``path.journal`` and fsynced, and folded into a new snapshot by
+    ``compact()``. A removal moves the last entry into the freed slot, so
+    entries stay in insertion order until removals start, every change is
+    O(1) and pages are plain slices.
+
+    Every writer (API, detector, CLI) takes an exclusive flock on
+    ``path.lock``, so updates from several processes are neither lost nor
+    interleaved. Before each operation the store checks the snapshot's
+    identity and the journal's size and replays what other processes wrote.
+    """
+
+    def __init__(self, path: str = AI_BLOCK_FILE, compact_threshold: int = COMPACT_THRESHOLD,
+                 compact_interval: float = COMPACT_INTERVAL):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.compact_threshold = compact_threshold
+        self.compact_interval = compact_interval
+        self.items: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.generation = 0
+        self.journal_records = 0
+        self.journal_since = 0.0
+        self._snapshot_sig: Optional[Tuple[int, int]] = None
+        self._journal_offset = 0
+        self._lock = threading.RLock()
+        with self._locked(fcntl.LOCK_SH):
+            self._load()
+
+    # ---------------- locking and disk sync ----------------
+    @contextmanager
+    def _locked(self, mode: int = fcntl.LOCK_EX):
+        with self._lock:
+            fd = os.open(self.lock_path, os.O_RDONLY | os.O_CREAT, 0o666)
+            try:
+                fcntl.flock(fd, mode)
+                yield
+            finally:
+                os.close(fd)  # releases the flock
+
+    def _stat_snapshot(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return 0
+
+    def _load(self):
+        self.items, self.positions = [], {}
+        self._snapshot_sig = self._stat_snapshot()
+        if self._snapshot_sig is not None:
+            with open(self.path) as f:
+                for line in f:
+                    entry = parse_entry(line)
+                    if entry:
+                        self._add(entry)
+        self._journal_offset = 0
+        self.journal_records = 0
+        self.journal_since = 0.0
+        self._replay()
+        self.generation += 1
+
+    def _replay(self) -> bool:
+        """Apply journal records written since the last sync; True if any were."""
+        if not os.path.exists(self.journal_path):
+            return False
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # ignore a torn trailing record
+        if not end:
+            return False
+        for record in data[:end].decode().splitlines():
+            entry = record[1:]
+            if record.startswith("+"):
+                self._add(entry)
+            elif record.startswith("-"):
+                self._remove(entry)
+            self.journal_records += 1
+        if not self.journal_since:
+            self.journal_since = time.monotonic()
+        self._journal_offset += end
+        return True
+
+    def _sync(self):
+        """Pick up changes made by other processes (caller holds the flock)."""
+        size = self._journal_size()
+        if self._stat_snapshot() != self._snapshot_sig or size < self._journal_offset:
+            self._load()
+        elif size > self._journal_offset and self._replay():
+            self.generation += 1
+
+    def refresh(self):
+        with self._locked(fcntl.LOCK_SH):
+            self._sync()
+
+    # ---------------- in-memory ordered set ----------------
+    def _add(self, entry: str) -> bool:
+        if entry in self.positions:
+            return False
+        self.positions[entry] = len(self.items)
+        self.items.append(entry)
+        return True
+
+    def _remove(self, entry: str) -> bool:
+        position = self.positions.pop(entry, None)
+        if position is None:
+            return False
+        last = self.items.pop()
+        if last != entry:
+            self.items[position] = last
+            self.positions[last] = position
+        return True
+
+    # ---------------- reads ----------------
+    def __contains__(self, entry: str) -> bool:
+        self.refresh()
+        return entry in self.positions
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self.positions)
+
+    @property
+    def size(self) -> int:
+        """Entry count as of the last sync, without touching the disk."""
+        return len(self.positions)
+
+    def present(self, entries: Iterable[str]) -> Set[str]:
+        """The given (normalized) entries that are currently in the blocklist."""
+        with self._locked(fcntl.LOCK_SH):
+            self._sync()
+            return {entry for entry in entries if entry in self.positions}
+
+    def version(self) -> int:
+        """Counter bumped whenever the contents change (here or in another process)."""
+        self.refresh()
+        return self.generation
+
+    def entries(self) -> List[str]:
+        with self._locked(fcntl.LOCK_SH):
+            self._sync()
+            return list(self.items)
+
+    def page(self, start: int, count: int) -> List[str]:
+        with self._locked(fcntl.LOCK_SH):
+            self._sync()
+            return self.items[start:start + count]
+
+    # ---------------- writes ----------------
+    def _append_journal(self, records: List[str]):
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        try:
+            size = os.fstat(fd).st_size
+            if size > self._journal_offset:
+                # A torn record left by a crashed writer; drop it before appending
+                os.ftruncate(fd, self._journal_offset)
+            os.write(fd, "".join(record + "\n" for record in records).encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._journal_offset = self._journal_size()
+        self.journal_records += len(records)
+        if not self.journal_since:
+            self.journal_since = time.monotonic()
+
+    def _change(self, entries: Iterable[str], add: bool) -> List[str]:
+        with self._locked():
+            self._sync()
+            changed = []
+            for raw in entries:
+                entry = parse_entry(raw)
+                if entry and (self._add(entry) if add else self._remove(entry)):
+                    changed.append(entry)
+            if changed:
+                self._append_journal([("+" if add else "-") + entry for entry in changed])
+                self.generation += 1
+                if self.journal_records >= self.compact_threshold:
+                    self._compact()
+            return changed
+
+    def add(self, entries: Iterable[str]) -> List[str]:
+        """Add entries in one fsynced journal write; returns the normalized entries that were new."""
+        return self._change(entries, add=True)
+
+    def remove(self, entries: Iterable[str]) -> List[str]:
+        """Remove entries in one fsynced journal write; returns those that were present."""
+        return self._change(entries, add=False)
+
+    def replace(self, entries: Iterable[str]):
+        """Make the blocklist exactly ``entries`` (a full detector rescan) with one snapshot write."""
+        with self._locked():
+            self._sync()
+            self.items, self.positions = [], {}
+            for raw in entries:
+                entry = parse_entry(raw)
+                if entry:
+                    self._add(entry)
+            self.generation += 1
+            self._compact()
+
+    # ---------------- compaction ----------------
+    def _compact(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("".join(entry + "\n" for entry in self.items))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o666)
+        os.replace(tmp_path, self.path)
+        # A crash here only leaves records that replay idempotently over the new snapshot
+        if os.path.exists(self.journal_path):
+            os.truncate(self.journal_path, 0)
+        self._snapshot_sig = self._stat_snapshot()
+        self._journal_offset = 0
+        self.journal_records = 0
+        self.journal_since = 0.0
+
+    def compact(self):
+        with self._locked():
+            self._sync()
+            self._compact()
+
+    def maybe_compact(self) -> bool:
+        """Compact if the journal is large or has been pending for ``compact_interval``."""
+        self.refresh()
+        if self.journal_records >= self.compact_threshold or (
+                self.journal_records and time.monotonic() - self.journal_since >= self.compact_interval):
+            self.compact()
+            return True
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the AI blocklist (ai_block.txt) safely")
+    parser.add_argument("command", choices=["add", "remove", "list", "compact"])
+    parser.add_argument("entries", nargs="*", help="IPs or CIDRs")
+    parser.add_argument("--file", default=AI_BLOCK_FILE, help="blocklist snapshot path")
+    args = parser.parse_args()
+
+    store = BlocklistStore(args.file)
+    if args.command == "list":
+        for entry in store.entries():
+            print(entry)
+    elif args.command == "compact":
+        store.compact()
+        print(f"[ok] Compacted {len(store)} entries into {args.file}")
+    else:
+        normalized = {entry: parse_entry(entry) for entry in args.entries}
+        valid = [entry for entry in normalized.values() if entry]
+        changed = set(store.add(valid) if args.command == "add" else store.remove(valid))
+        verb = "Added" if args.command == "add" else "Removed"
+        for entry, value in normalized.items():
+            print(f"[ok] {verb} {entry}" if value in changed else f"[!] Unchanged {entry}")
+        if not changed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import ipaddress
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from firewall import AI_BLOCK_FILE, FIREHOL_FILE, read_entries
+
+WHITELIST_FILE = "/home/ubuntu/idps/ip-blocker/datasets/whitelist.txt"
+
+# Checked in this order; the whitelist wins over the block feeds.
+SOURCES = {"whitelist": WHITELIST_FILE, "firehol": FIREHOL_FILE, "ai_block": AI_BLOCK_FILE}
+BLOCK_SOURCES = ("firehol", "ai_block")
+
+BITS = {4: 32, 6: 128}
+
+
+def parse_ip(ip: str) -> Optional[Tuple[int, int]]:
+    """(version, integer value) of an address, or None if it is not one."""
+    try:
+        address = ipaddress.ip_address(ip.strip())
+    except (AttributeError, ValueError):
+        return None
+    return address.version, int(address)
+
+
+class PrefixTable:
+    """Longest-prefix match over one list of networks.
+
+    Networks are kept in one hash table per (family, prefix length), keyed by
+    the network bits; a lookup probes the lengths present from longest to
+    shortest, so it costs at most one dict lookup per distinct length (about
+    20 for firehol_level1) regardless of the list size.
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        self.tables: Dict[int, Dict[int, Dict[int, str]]] = {4: {}, 6: {}}
+        self.lengths: Dict[int, List[int]] = {4: [], 6: []}
+        self.size = 0
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: str):
+        network = ipaddress.ip_network(entry, strict=False)
+        bits = BITS[network.version]
+        by_length = self.tables[network.version]
+        if network.prefixlen not in by_length:
+            by_length[network.prefixlen] = {}
+            self.lengths[network.version] = sorted(by_length, reverse=True)
+        key = int(network.network_address) >> (bits - network.prefixlen)
+        if key not in by_length[network.prefixlen]:
+            self.size += 1
+        by_length[network.prefixlen][key] = entry
+
+    def longest(self, version: int, value: int) -> Optional[str]:
+        """Most specific entry covering the address, or None."""
+        bits = BITS[version]
+        by_length = self.tables[version]
+        for length in self.lengths[version]:
+            entry = by_length[length].get(value >> (bits - length))
+            if entry is not None:
+                return entry
+        return None
+
+    def overlapping(self, entry: str) -> Optional[str]:
+        """An entry that covers or lies inside the network ``entry``, or None."""
+        network = ipaddress.ip_network(entry, strict=False)
+        version, bits = network.version, BITS[network.version]
+        covering = self.longest(version, int(network.network_address))
+        if covering is not None and ipaddress.ip_network(covering).prefixlen <= network.prefixlen:
+            return covering
+        key = int(network.network_address) >> (bits - network.prefixlen)
+        for length, networks in self.tables[version].items():
+            if length > network.prefixlen:
+                for inner_key, inner in networks.items():
+                    if inner_key >> (length - network.prefixlen) == key:
+                        return inner
+        return None
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class CidrIndex:
+    """Immutable snapshot of one PrefixTable per source (whitelist, firehol, ai_block)."""
+
+    def __init__(self, tables: Dict[str, PrefixTable]):
+        self.tables = tables
+
+    def match(self, ip: str) -> Optional[Dict[str, str]]:
+        """Longest matching entry per source; None if ``ip`` is not an address."""
+        parsed = parse_ip(ip)
+        if parsed is None:
+            return None
+        matches = {}
+        for source, table in self.tables.items():
+            entry = table.longest(*parsed)
+            if entry is not None:
+                matches[source] = entry
+        return matches
+
+    def match_many(self, ips: Iterable[str]) -> List[Optional[Dict[str, str]]]:
+        """``match`` for a column of IPs, resolving every distinct IP once."""
+        ips = list(ips)
+        results = {ip: self.match(ip) for ip in set(ips)}
+        return [results[ip] for ip in ips]
+
+    def whitelisted(self, ip: str) -> bool:
+        matches = self.match(ip)
+        return bool(matches) and "whitelist" in matches
+
+    def blocked(self, ip: str) -> bool:
+        matches = self.match(ip)
+        return bool(matches) and any(source in matches for source in BLOCK_SOURCES)
+
+    def skip_mask(self, ips: Iterable[str], sources: Iterable[str] = SOURCES) -> List[bool]:
+        """True for each IP matched by any of ``sources`` (default: whitelisted or already blocked)."""
+        sources = tuple(sources)
+        return [bool(matches) and any(source in matches for source in sources) for matches in self.match_many(ips)]
+
+    def overlapping(self, source: str, entry: str) -> Optional[str]:
+        table = self.tables.get(source)
+        return table.overlapping(entry) if table is not None else None
+
+    def sizes(self) -> Dict[str, int]:
+        return {source: len(table) for source, table in self.tables.items()}
+
+
+class CidrIndexCache:
+    """Serves a CidrIndex and rebuilds the table of a source only when it changes.
+
+    A source is a file path, changed when its (inode, size, mtime) moves as for
+    merged_logs.csv, or a BlocklistStore, changed when its ``version()`` does.
+    The new snapshot is published with a single reference swap.
+    """
+
+    def __init__(self, sources: Optional[Dict[str, object]] = None):
+        self.sources = dict(SOURCES if sources is None else sources)
+        self._tables: Dict[str, Tuple[Optional[Tuple[int, int, int]], PrefixTable]] = {}
+        self._signatures: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self._index = CidrIndex({})
+        self._lock = threading.Lock()
+
+    def _stat(self, path) -> Optional[Tuple[int, int, int]]:
+        if not isinstance(path, str):
+            return path.version(), 0, 0
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def get(self) -> CidrIndex:
+        signatures = {source: self._stat(path) for source, path in self.sources.items()}
+        if signatures == self._signatures:
+            return self._index
+        with self._lock:
+            tables = {}
+            for source, path in self.sources.items():
+                cached = self._tables.get(source)
+                if cached is None or cached[0] != signatures[source]:
+                    if not isinstance(path, str):
+                        entries = path.entries()
+                    else:
+                        entries = read_entries(path) if signatures[source] is not None else ()
+                    cached = self._tables[source] = (signatures[source], PrefixTable(entries))
+                tables[source] = cached[1]
+            self._index, self._signatures = CidrIndex(tables), signatures
+            return self._index
@@ -0,0 +1,396 @@
+import os
+import pickle
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from blocklist import BlocklistStore
+from cidr_index import SOURCES as INDEX_SOURCES
+from cidr_index import CidrIndexCache
+from eve_decoder import EveDecoder
+from eve_tailer import EveTailer
+from geoip import GEO_DB, GeoIP
+from merged_logs import BACKUPS as MERGED_BACKUPS
+from merged_logs import FIELDS as MERGED_COLUMNS
+from merged_logs import MAX_BYTES as MERGED_MAX_BYTES
+from merged_logs import rotate
+from pcap_ingest import BATCH_SIZE as PCAP_BATCH_SIZE
+from pcap_ingest import PcapIngestor
+
+# ---------------- CONFIG ----------------
+SURICATA_LOG = "/var/log/suricata/eve.json"
+PCAP_FOLDER = "/home/ubuntu/pcaps/"
+
+AI_BLOCK_FILE = "/home/ubuntu/idps/ip-blocker/datasets/ai_block.txt"
+MERGED_FILE = "/home/ubuntu/idps/ip-blocker/datasets/merged_logs.csv"
+PROCESSED_PCAPS = "/home/ubuntu/idps/ip-blocker/datasets/processed_pcaps.txt"
+MODEL_FILE = "/home/ubuntu/idps/ip-blocker/datasets/detector_model.pkl"
+EVE_CHECKPOINT = "/home/ubuntu/idps/ip-blocker/datasets/detector_checkpoint.json"
+
+# Captures are decoded in a process pool, PCAP_BATCH_SIZE packets per task;
+# a cycle consumes at most PCAP_MAX_BATCHES and resumes the rest next time.
+PCAP_WORKERS = None  # os.cpu_count()
+PCAP_MAX_BATCHES = 20
+
+DEDUP_COLUMNS = ["src_ip", "dest_ip", "dest_port", "proto", "attack_type", "timestamp"]
+FEATURES = ["dest_port", "proto_code"]
+
+# Incremental mode: the IsolationForest is refit on the most recent
+# TRAIN_SAMPLE_SIZE events every RETRAIN_INTERVAL seconds, or sooner when a
+# batch looks like drift (unseen protocol, or an anomaly rate well above the
+# contamination the model was fit for).
+CONTAMINATION = 0.01
+RETRAIN_INTERVAL = 3600
+TRAIN_SAMPLE_SIZE = 50_000
+MIN_TRAIN_SAMPLES = 100
+DRIFT_MIN_BATCH = 500
+DRIFT_FACTOR = 5
+
+
+class DetectionEngine:
+    """The ai_detect.py pipeline as a reusable object.
+
+    The GeoIP lookups, decoder and PCAP ingestor are created once and kept
+    across cycles, so a long-lived caller only pays for the work of each cycle.
+
+    With ``incremental`` (the default) each cycle reads only the eve.json bytes
+    appended since the persisted checkpoint, scores them with the persisted
+    model, and appends to merged_logs.csv (rotated past ``merged_max_bytes``)
+    and ai_block.txt. Without it every
+    cycle re-reads the whole log, refits from scratch and rewrites the outputs,
+    as ai_detect.py originally did.
+    """
+
+    def __init__(
+        self,
+        suricata_log: str = SURICATA_LOG,
+        pcap_folder: str = PCAP_FOLDER,
+        geo_db: str = GEO_DB,
+        ai_block_file: str = AI_BLOCK_FILE,
+        merged_file: str = MERGED_FILE,
+        processed_pcaps: str = PROCESSED_PCAPS,
+        blocklist: Optional[BlocklistStore] = None,
+        index: Optional[CidrIndexCache] = None,
+        incremental: bool = True,
+        model_file: str = MODEL_FILE,
+        checkpoint_file: str = EVE_CHECKPOINT,
+        retrain_interval: float = RETRAIN_INTERVAL,
+        merged_max_bytes: int = MERGED_MAX_BYTES,
+        merged_backups: int = MERGED_BACKUPS,
+    ):
+        self.suricata_log = suricata_log
+        self.pcap_folder = pcap_folder
+        self.ai_block_file = ai_block_file
+        self.blocklist = blocklist or BlocklistStore(ai_block_file)
+        self.merged_file = merged_file
+        self.merged_max_bytes = merged_max_bytes
+        self.merged_backups = merged_backups
+        self.processed_pcaps = processed_pcaps
+        # Whitelisted (datasets/whitelist.txt) and already-blocked sources are not scored
+        self.index = index or CidrIndexCache({**INDEX_SOURCES, "ai_block": self.blocklist})
+        self.incremental = incremental
+        self.model_file = model_file
+        self.retrain_interval = retrain_interval
+        self.decoder = EveDecoder(["alert", "flow"])
+        self.tailer = EveTailer(
+            suricata_log,
+            on_events=lambda events, offsets: self._events.extend(events),
+            decoder=self.decoder,
+            checkpoint_path=checkpoint_file if incremental else None,
+            autosave=False,
+        )
+        self._events: List[Dict] = []
+        self.geo = GeoIP(geo_db)
+        self.model: Optional[IsolationForest] = None
+        self.trained_at = 0.0
+        self.proto_codes: Dict[str, int] = {}
+        self.sample = deque(maxlen=TRAIN_SAMPLE_SIZE)
+        if incremental:
+            self.load_model()
+        self.pcaps = PcapIngestor(
+            pcap_folder, processed_pcaps, workers=PCAP_WORKERS, batch_size=PCAP_BATCH_SIZE, max_batches=PCAP_MAX_BATCHES
+        )
+
+    # ---------------- Suricata logs ----------------
+    def read_suricata(self) -> pd.DataFrame:
+        if not self.incremental:
+            self.tailer.stop()
+            self.tailer = EveTailer(self.suricata_log, on_events=self.tailer.on_events, decoder=self.decoder)
+        self._events = []
+        self.tailer.poll()
+        suricata_data = [{
+            "src_ip": log.get("src_ip"),
+            "dest_ip": log.get("dest_ip"),
+            "dest_port": log.get("dest_port", 0),
+            "proto": log.get("proto", "NA"),
+            "attack_type": log.get("alert", {}).get("signature", "flow"),
+            "timestamp": log.get("timestamp")
+        } for log in self._events]
+        self._events = []
+        return pd.DataFrame(suricata_data)
+
+    # ---------------- PCAP captures ----------------
+    def read_pcaps(self) -> pd.DataFrame:
+        batches = []
+        self.pcaps.ingest(lambda path, columns: batches.append(pd.DataFrame(columns)))
+        if not batches:
+            return pd.DataFrame()
+        df = pd.concat(batches, ignore_index=True)
+        df["attack_type"] = "NA"
+        return df
+
+    # ---------------- GeoIP lookup ----------------
+    def lookup_countries(self, df: pd.DataFrame):
+        df["country"] = self.geo.enrich(df["src_ip"])
+
+    # ---------------- Model state ----------------
+    def load_model(self):
+        if not os.path.exists(self.model_file):
+            return
+        try:
+            with open(self.model_file, "rb") as f:
+                state = pickle.load(f)
+            self.model = state["model"]
+            self.trained_at = state["trained_at"]
+            self.proto_codes = state["proto_codes"]
+            self.sample.extend(state["sample"])
+            print(f"[+] Loaded detection model trained at {time.ctime(self.trained_at)}")
+        except Exception as e:
+            print(f"[!] Could not load {self.model_file}, will retrain: {e}")
+
+    def save_model(self):
+        state = {
+            "model": self.model,
+            "trained_at": self.trained_at,
+            "proto_codes": self.proto_codes,
+            "sample": list(self.sample),
+        }
+        with open(self.model_file + ".tmp", "wb") as f:
+            pickle.dump(state, f)
+        os.replace(self.model_file + ".tmp", self.model_file)
+
+    def encode_protos(self, protos: pd.Series) -> Tuple[pd.Series, bool]:
+        """Stable protocol codes across cycles; also reports whether a new protocol appeared."""
+        unseen = [p for p in protos.unique() if p not in self.proto_codes]
+        for proto in unseen:
+            self.proto_codes[proto] = len(self.proto_codes)
+        return protos.map(self.proto_codes), bool(unseen) and self.model is not None
+
+    def train(self, reason: str):
+        X = pd.DataFrame(list(self.sample), columns=FEATURES)
+        self.model = IsolationForest(contamination=CONTAMINATION, random_state=42).fit(X)
+        self.trained_at = time.time()
+        print(f"[+] Retrained detection model on {len(X)} events ({reason})")
+
+    def retrain_reason(self, new_protocol: bool) -> Optional[str]:
+        if len(self.sample) < MIN_TRAIN_SAMPLES:
+            return None
+        if self.model is None:
+            return "no model"
+        if new_protocol:
+            return "new protocol"
+        if time.time() - self.trained_at >= self.retrain_interval:
+            return "schedule"
+        return None
+
+    # ---------------- AI anomaly detection ----------------
+    def score(self, df: pd.DataFrame) -> Tuple[List[str], Optional[str]]:
+        if self.incremental:
+            df["proto_code"], new_protocol = self.encode_protos(df["proto"])
+        else:
+            df["proto_code"], new_protocol = df["proto"].astype('category').cat.codes, False
+
+        # Exclude whitelisted and already-blocked sources from AI anomaly detection.
+        # A full rescan rewrites ai_block.txt, so its current entries are scored again.
+        sources = INDEX_SOURCES if self.incremental else ("whitelist", "firehol")
+        skip = pd.Series(self.index.get().skip_mask(df["src_ip"], sources), index=df.index, dtype=bool)
+        df_ai = df[~skip].copy()
+        X = df_ai[FEATURES].fillna(0)
+
+        if not self.incremental:
+            self.sample = deque(X.itertuples(index=False, name=None))
+            retrained = "full rescan" if not X.empty else None
+            if retrained:
+                self.train(retrained)
+        else:
+            self.sample.extend(X.itertuples(index=False, name=None))
+            retrained = self.retrain_reason(new_protocol)
+            if retrained:
+                self.train(retrained)
+
+        if self.model is None or X.empty:
+            df["anomaly"] = None
+            return [], retrained
+
+        df_ai["anomaly"] = self.model.predict(X)
+        anomaly_rate = (df_ai["anomaly"] == -1).mean()
+        if (self.incremental and not retrained and len(X) >= DRIFT_MIN_BATCH
+                and anomaly_rate > DRIFT_FACTOR * CONTAMINATION):
+            retrained = f"drift: {anomaly_rate:.1%} anomalous"
+            self.train(retrained)
+            df_ai["anomaly"] = self.model.predict(X)
+
+        # Map anomalies back to main df
+        df["anomaly"] = df_ai["anomaly"]
+
+        suspicious_ips = df[df["anomaly"] == -1]["src_ip"].unique()
+        return list(suspicious_ips), retrained
+
+    # ---------------- Save results ----------------
+    def save(self, df: pd.DataFrame, suspicious_ips: List[str], retrained: Optional[str]):
+        if self.incremental:
+            self.append_results(df, suspicious_ips)
+        else:
+            self.blocklist.replace(suspicious_ips)
+
+            # Write to a temp file and rename so readers never see a half-written CSV
+            df.to_csv(self.merged_file + ".tmp", index=False)
+            os.replace(self.merged_file + ".tmp", self.merged_file)
+
+        self.pcaps.commit()
+
+        if self.incremental:
+            if retrained:
+                self.save_model()
+            # Only advance past these events once their results are on disk.
+            self.tailer.save_checkpoint()
+
+    def append_results(self, df: pd.DataFrame, suspicious_ips: List[str]):
+        self.blocklist.add(suspicious_ips)
+
+        # One write on an O_APPEND descriptor, so a reader sees either none or all of the batch
+        header = not os.path.exists(self.merged_file) or os.path.getsize(self.merged_file) == 0
+        data = df.to_csv(index=False, header=header, columns=MERGED_COLUMNS).encode()
+        fd = os.open(self.merged_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        rotate(self.merged_file, self.merged_max_bytes, self.merged_backups)
+
+    def run_cycle(self) -> Dict:
+        """Run one detection pass; returns counts and per-stage timings in seconds."""
+        timings = {}
+        started = last = time.perf_counter()
+
+        def lap(stage: str):
+            nonlocal last
+            now = time.perf_counter()
+            timings[stage] = round(now - last, 4)
+            last = now
+
+        # Captures first: the tailer's position moves as soon as it is polled
+        df_py = self.read_pcaps()
+        lap("read_pcaps")
+        df_suri = self.read_suricata()
+        lap("read_eve")
+
+        df = pd.concat([df_suri, df_py], ignore_index=True)
+        stats = {"events": len(df), "suspicious_ips": [], "retrained": None, "timings": timings}
+        if df.empty:
+            print("[!] No valid logs found.")
+            self.pcaps.commit()
+            if self.incremental:
+                self.tailer.save_checkpoint()
+        else:
+            df.drop_duplicates(subset=DEDUP_COLUMNS, inplace=True)
+            self.lookup_countries(df)
+            lap("geoip")
+            suspicious_ips, retrained = self.score(df)
+            lap("score")
+            self.save(df, suspicious_ips, retrained)
+            lap("save")
+            stats["retrained"] = retrained
+
+            print(f"[+] AI-detected suspicious IPs ({len(suspicious_ips)}):")
+            for ip in suspicious_ips:
+                print(ip)
+            print("[+] Processing complete!")
+            stats["suspicious_ips"] = suspicious_ips
+
+        timings["total"] = round(time.perf_counter() - started, 4)
+        stats["finished_at"] = time.time()
+        return stats
+
+    def close(self):
+        self.tailer.stop()
+        self.pcaps.close()
+        self.geo.close()
+
+
+class DetectionWorker:
+    """Runs a DetectionEngine every ``interval`` seconds on a background thread.
+
+    The engine is built on the worker thread, so its heavy setup does not delay
+    the caller. ``on_cycle`` is called with each cycle's stats (e.g. to push the
+    new blocklist to the firewall); recent stats are kept for ``status()``.
+    """
+
+    def __init__(
+        self,
+        engine_factory: Callable[[], DetectionEngine] = DetectionEngine,
+        interval: float = 10.0,
+        on_cycle: Optional[Callable[[Dict], None]] = None,
+        history: int = 100,
+    ):
+        self.engine_factory = engine_factory
+        self.interval = interval
+        self.on_cycle = on_cycle
+        self.history = deque(maxlen=history)
+        self.cycles = 0
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        engine = None
+        while not self._stop.is_set():
+            try:
+                if engine is None:
+                    engine = self.engine_factory()
+                stats = engine.run_cycle()
+                self.cycles += 1
+                self.last_error = None
+                self.history.append(stats)
+                print(f"Detection cycle {self.cycles} took {stats['timings']['total']:.2f}s")
+                if self.on_cycle is not None:
+                    self.on_cycle(stats)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error in periodic AI detection: {e}")
+            self._stop.wait(self.interval)
+        if engine is not None:
+            engine.close()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Dict:
+        history = list(self.history)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "cycles": self.cycles,
+            "last_error": self.last_error,
+            "last_cycle": history[-1] if history else None,
+            "history": [
+                {
+                    "finished_at": stats["finished_at"],
+                    "events": stats["events"],
+                    "retrained": stats["retrained"],
+                    "timings": stats["timings"],
+                }
+                for stats in history
+            ],
+        }
@@ -0,0 +1,63 @@
+import json
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Fastest first; each backend is only listed if it is importable.
+BACKENDS: Dict[str, Callable[[bytes], object]] = {}
+try:
+    import orjson
+    BACKENDS["orjson"] = orjson.loads
+except ImportError:
+    pass
+try:
+    import ujson
+    BACKENDS["ujson"] = ujson.loads
+except ImportError:
+    pass
+BACKENDS["json"] = json.loads
+
+DEFAULT_BACKEND = next(iter(BACKENDS))
+
+
+class EveDecoder:
+    """Decodes eve.json lines, skipping unwanted event types before parsing them.
+
+    Suricata writes compact JSON, so a line of a wanted type contains e.g.
+    ``"event_type":"alert"`` verbatim; lines without any such marker (flow,
+    stats, dns, http, ...) are dropped with a substring check. Lines that pass
+    are decoded with the fastest available backend and the event type is
+    verified on the decoded object.
+    """
+
+    def __init__(self, event_types: Iterable[str] = ("alert",), backend: Optional[str] = None, prefilter: bool = True):
+        self.event_types = set(event_types)
+        self.backend = backend or DEFAULT_BACKEND
+        self.loads = BACKENDS[self.backend]
+        self.prefilter = prefilter
+        self.markers = []
+        for event_type in self.event_types:
+            self.markers.append(b'"event_type":"%s"' % event_type.encode())
+            self.markers.append(b'"event_type": "%s"' % event_type.encode())
+
+    def wanted(self, line: bytes) -> bool:
+        for marker in self.markers:
+            if marker in line:
+                return True
+        return False
+
+    def decode(self, line: bytes) -> Optional[Dict]:
+        """Decoded event, or None if the line is blank, unwanted or malformed."""
+        if self.prefilter and not self.wanted(line):
+            return None
+        if not line.strip():
+            return None
+        try:
+            data = self.loads(line)
+        except ValueError as e:
+            print(f"JSON decode error: {e}")
+            return None
+        if not isinstance(data, dict) or data.get("event_type") not in self.event_types:
+            return None
+        return data
+
+    def decode_lines(self, lines: Iterable[bytes]) -> List[Dict]:
+        return [data for data in map(self.decode, lines) if data is not None]
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from eve_decoder import EveDecoder
+
+
+class EveTailer:
+    """Follows eve.json from a byte offset and hands newly appended events to a callback.
+
+    Rotation is detected by an inode change (the rest of the old file is drained
+    through the still-open handle first) and truncation by the file shrinking
+    below the saved offset. If ``checkpoint_path`` is set, the inode/offset pair
+    is persisted after every poll so a restarted process resumes where it left off.
+
+    ``on_events`` receives the decoded events together with, for each event, the
+    byte offset just past its line in the file identified by ``inode``;
+    ``on_truncate`` is called once the file is found truncated, before the
+    events re-read from the start are delivered.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        on_events: Callable[[List[Dict], List[int]], None],
+        event_types: Iterable[str] = ("alert",),
+        checkpoint_path: Optional[str] = None,
+        interval: float = 1.0,
+        chunk_size: int = 1 << 20,
+        decoder: Optional[EveDecoder] = None,
+        autosave: bool = True,
+        on_truncate: Optional[Callable[[], None]] = None,
+    ):
+        self.path = path
+        self.on_events = on_events
+        self.on_truncate = on_truncate
+        self.decoder = decoder or EveDecoder(event_types)
+        self.autosave = autosave
+        self.checkpoint_path = checkpoint_path
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._file = None
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._partial = b""
+        self._saved = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._load_checkpoint()
+
+    @property
+    def inode(self) -> Optional[int]:
+        return self._inode
+
+    @property
+    def offset(self) -> int:
+        return self._offset - len(self._partial)
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path) as f:
+                data = json.load(f)
+            self._inode = data.get("inode")
+            self._offset = int(data.get("offset", 0))
+        except (ValueError, OSError) as e:
+            print(f"Error reading checkpoint {self.checkpoint_path}: {e}")
+
+    def save_checkpoint(self):
+        if not self.checkpoint_path or self._saved == (self._inode, self.offset):
+            return
+        tmp_path = self.checkpoint_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"inode": self._inode, "offset": self.offset}, f)
+            os.replace(tmp_path, self.checkpoint_path)
+            self._saved = (self._inode, self.offset)
+        except OSError as e:
+            print(f"Error writing checkpoint {self.checkpoint_path}: {e}")
+
+    def _open(self, st: os.stat_result):
+        if self._inode != st.st_ino:
+            # A different file from the one in the checkpoint: start from the top.
+            self._offset = 0
+        self._file = open(self.path, "rb")
+        self._inode = st.st_ino
+        self._partial = b""
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+
+    def _read_available(self) -> int:
+        delivered = 0
+        self._file.seek(self._offset)
+        while True:
+            chunk = self._file.read(self.chunk_size)
+            if not chunk:
+                break
+            data = self._partial + chunk
+            end = data.rfind(b"\n")
+            if end >= 0:
+                delivered += self._dispatch(data[:end].split(b"\n"), self.offset)
+            # Only move past lines on_events has taken; if it raised, the next poll retries them
+            self._offset += len(chunk)
+            self._partial = data[end + 1:] if end >= 0 else data
+        return delivered
+
+    def _dispatch(self, lines: List[bytes], position: int) -> int:
+        events, offsets = [], []
+        decode = self.decoder.decode
+        for line in lines:
+            position += len(line) + 1
+            data = decode(line)
+            if data is not None:
+                events.append(data)
+                offsets.append(position)
+        if events:
+            self.on_events(events, offsets)
+        return len(events)
+
+    def poll(self) -> int:
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                st = None
+
+            delivered = 0
+            if self._file is not None and (st is None or st.st_ino != self._inode):
+                # Rotated or removed: finish the old file before moving on.
+                delivered += self._read_available()
+                self._close()
+                self._inode = None
+            if st is None:
+                return delivered
+
+            if self._file is None:
+                self._open(st)
+            if st.st_size < self.offset:
+                print(f"{self.path} was truncated, re-reading from the start")
+                self._offset = 0
+                self._partial = b""
+                if self.on_truncate is not None:
+                    self.on_truncate()
+
+            delivered += self._read_available()
+            if self.autosave:
+                self.save_checkpoint()
+            return delivered
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error tailing {self.path}: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._close()
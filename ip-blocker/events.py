@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional
+
+TOPICS = ("alert", "block", "unblock", "risk", "health")
+MAX_PENDING = 1000  # alerts buffered per client before the oldest are dropped
+MAX_SUBSCRIBERS = 100
+KEEPALIVE = 15.0
+
+
+class Subscription:
+    """One client's filters and its pending events.
+
+    Alerts queue individually (the oldest are dropped past ``max_pending``
+    and reported as a count). Everything else is state that can be merged
+    while the client is slow: one pending risk update per IP, one health
+    sample, and one pending block-or-unblock action per blocklist entry where
+    the last action wins; the actions go out as one event per (topic, source).
+    """
+
+    def __init__(self, topics: Iterable[str] = TOPICS, ips: Optional[Iterable[str]] = None,
+                 max_severity: Optional[int] = None, max_pending: int = MAX_PENDING):
+        self.alerts: deque = deque(maxlen=max_pending)
+        self.updates: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.blocklist: "OrderedDict[str, Dict]" = OrderedDict()  # entry -> latest block/unblock event
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.closed = False
+        self.ready = asyncio.Event()
+        self.update(topics, ips, max_severity)
+
+    def update(self, topics: Iterable[str] = TOPICS, ips: Optional[Iterable[str]] = None,
+               max_severity: Optional[int] = None):
+        """Replace the filters: topics, IPs of interest, and alerts at ``max_severity`` or worse (1 is highest)."""
+        self.topics = set(topics)
+        self.ips = set(ips) if ips else None
+        self.max_severity = max_severity
+
+    def wants(self, event: Dict) -> bool:
+        if event["type"] not in self.topics:
+            return False
+        if self.ips is not None and event["ips"] is not None and self.ips.isdisjoint(event["ips"]):
+            return False
+        if event["type"] == "alert" and self.max_severity is not None:
+            severity = event["data"].get("severity")
+            return severity is not None and severity <= self.max_severity
+        return True
+
+    def put(self, event: Dict):
+        topic = event["type"]
+        if topic == "alert":
+            if len(self.alerts) == self.alerts.maxlen:
+                self.dropped += 1
+            self.alerts.append(event)
+        elif topic in ("block", "unblock"):
+            for entry in event["data"]["entries"]:
+                self.blocklist.pop(entry, None)
+                if len(self.blocklist) >= self.max_pending:
+                    self.blocklist.popitem(last=False)
+                    self.dropped += 1
+                self.blocklist[entry] = event
+        else:
+            key = (topic, event["data"].get("ip"))
+            if key not in self.updates and len(self.updates) >= self.max_pending:
+                self.updates.popitem(last=False)
+                self.dropped += 1
+            self.updates[key] = event
+        self.ready.set()
+
+    def _blocklist_events(self) -> List[Dict]:
+        grouped: Dict[tuple, Dict] = {}
+        for entry, event in self.blocklist.items():
+            key = (event["type"], event["data"].get("source"))
+            pending = grouped.get(key)
+            if pending is None:
+                pending = grouped[key] = dict(event, data=dict(event["data"], entries=[]))
+            elif event["id"] > pending["id"]:
+                pending["id"], pending["time"] = event["id"], event["time"]
+            pending["data"]["entries"].append(entry)
+        return sorted(grouped.values(), key=lambda event: event["id"])
+
+    def drain(self) -> List[Dict]:
+        events = self._blocklist_events() + list(self.updates.values()) + list(self.alerts)
+        if self.dropped:
+            events.insert(0, {"type": "dropped", "id": None, "time": time.time(), "data": {"count": self.dropped}})
+        self.updates.clear()
+        self.blocklist.clear()
+        self.alerts.clear()
+        self.dropped = 0
+        self.ready.clear()
+        return events
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """Everything pending, waiting for at least one event; [] on timeout, None once closed."""
+        if not self.closed and not (self.updates or self.blocklist or self.alerts):
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        if self.closed:
+            return None
+        return self.drain()
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+
+class EventBus:
+    """Fans events from the ingest, detection and API paths out to push clients.
+
+    ``publish`` may be called from any thread; events are handed to the event
+    loop in one callback per call and filtered into each subscription there,
+    so every client shares the single ingest pass. Nothing is built when no
+    client is listening to a topic.
+    """
+
+    def __init__(self, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self.subscribers: List[Subscription] = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self._id_lock = threading.Lock()
+
+    def wants(self, topic: str) -> bool:
+        return any(topic in sub.topics for sub in self.subscribers)
+
+    def subscribe(self, **filters) -> Optional[Subscription]:
+        """Register a client (call from a coroutine); None when the subscriber limit is reached."""
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        self.loop = asyncio.get_running_loop()
+        sub = Subscription(**filters)
+        self.subscribers = self.subscribers + [sub]
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        self.subscribers = [s for s in self.subscribers if s is not sub]
+
+    def publish(self, topic: str, items: Iterable[Dict], ips=lambda data: None):
+        """Queue one event per item of ``items``; ``ips(data)`` names the IPs it concerns for IP filters."""
+        if self.loop is None or not self.wants(topic):
+            return
+        now = time.time()
+        with self._id_lock:
+            events = [{"type": topic, "id": next(self._ids), "time": now, "data": data, "ips": ips(data)}
+                      for data in items]
+        if not events:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._deliver(events)
+        else:
+            try:
+                self.loop.call_soon_threadsafe(self._deliver, events)
+            except RuntimeError:  # loop closed during shutdown
+                pass
+
+    def _deliver(self, events: List[Dict]):
+        for sub in self.subscribers:
+            for event in events:
+                if sub.wants(event):
+                    sub.put(event)
+
+
+def wire_format(event: Dict) -> Dict:
+    """The event as sent to clients (without the internal IP set)."""
+    return {key: event[key] for key in ("type", "id", "time", "data")}
@@ -0,0 +1,94 @@
+import csv
+import io
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from alert_store import NO_TIME, parse_timestamp
+from eve_decoder import EveDecoder
+from merged_logs import backup_paths, parse_row
+from serialization import encode_json
+
+ALERT_FIELDS = [
+    "timestamp", "src_ip", "src_port", "dest_ip", "dest_port", "proto",
+    "attack_type", "category", "severity", "signature_id", "country",
+]
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CHUNK_ROWS = 1000  # rows per chunk handed to the response
+
+
+def row_matches(row: Dict, ip: Optional[str], start: Optional[int], end: Optional[int]) -> bool:
+    """IP as source or destination, and start <= timestamp < end (epoch microseconds)."""
+    if ip is not None and ip != row.get("src_ip") and ip != row.get("dest_ip"):
+        return False
+    if start is not None or end is not None:
+        timestamp = parse_timestamp(row.get("timestamp"))
+        if timestamp == NO_TIME:
+            return False
+        if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+            return False
+    return True
+
+
+def eve_alerts(path: str, to_alert: Callable[[Dict], Dict], ip: Optional[str] = None,
+               start: Optional[int] = None, end: Optional[int] = None) -> Iterator[Dict]:
+    """Alerts from eve.json, read one line at a time; lines that cannot match the IP are skipped undecoded."""
+    decoder = EveDecoder(("alert",))
+    needle = b'"%s"' % ip.encode() if ip is not None else None
+    with open(path, "rb") as f:
+        for line in f:
+            if needle is not None and needle not in line:
+                continue
+            data = decoder.decode(line)
+            if data is None:
+                continue
+            alert = to_alert(data)
+            if row_matches(alert, ip, start, end):
+                yield alert
+
+
+def merged_rows(path: str, ip: Optional[str] = None, start: Optional[int] = None,
+                end: Optional[int] = None) -> Iterator[Dict]:
+    """Rows of merged_logs.csv and its rotated copies (oldest first) straight from disk."""
+    for part in backup_paths(path) + [path]:
+        try:
+            f = open(part, newline="")
+        except FileNotFoundError:
+            continue  # rotated away since it was listed
+        with f:
+            for row in csv.DictReader(f):
+                record = parse_row(row)
+                if row_matches(record, ip, start, end):
+                    yield record
+
+
+def ndjson_chunks(rows: Iterable[Dict], chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(encode_json(row))
+        if len(lines) == chunk_rows:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def csv_chunks(rows: Iterable[Dict], fields: List[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fields, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count == chunk_rows:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    yield buffer.getvalue().encode()
+
+
+def export_chunks(rows: Iterable[Dict], fmt: str, fields: List[str]) -> Iterator[bytes]:
+    """Encoded chunks of ``rows``; memory stays at one chunk whatever the number of rows."""
+    if fmt == "csv":
+        return csv_chunks(rows, fields)
+    return ndjson_chunks(rows)
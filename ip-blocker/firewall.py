@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+import argparse
+import ipaddress
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+FIREHOL_FILE = "/home/ubuntu/idps/ip-blocker/datasets/firehol_level1.txt"
+AI_BLOCK_FILE = "/home/ubuntu/idps/ip-blocker/datasets/ai_block.txt"
+IPSET_NAME = "known_bad_ips"
+
+# Overridable so the sync can run against a fake binary in tests
+IPSET_CMD = os.environ.get("IPSET_CMD", "/usr/sbin/ipset")
+IPTABLES_CMD = os.environ.get("IPTABLES_CMD", "/usr/sbin/iptables")
+IP6TABLES_CMD = os.environ.get("IP6TABLES_CMD", "/usr/sbin/ip6tables")
+
+MIN_MAXELEM = 65536
+COMMAND_TIMEOUT = 30
+KERNEL_STATE_MAX_AGE = 300  # seconds before the cached set contents are re-read
+
+
+class FirewallError(RuntimeError):
+    pass
+
+
+def parse_entry(line: str, warn: bool = True) -> Optional[str]:
+    """Normalized IP or CIDR of a block-list line, or None for blanks, comments and junk."""
+    entry = line.split("#", 1)[0].strip()
+    if not entry:
+        return None
+    try:
+        network = ipaddress.ip_network(entry, strict=False)
+    except ValueError:
+        if warn:
+            print(f"[!] Skipping invalid line: {entry}")
+        return None
+    if network.prefixlen == network.max_prefixlen:
+        return str(network.network_address)
+    return str(network)
+
+
+def read_entries(path: str) -> Set[str]:
+    entries = set()
+    if not os.path.exists(path):
+        print(f"[!] Block list not found: {path}")
+        return entries
+    with open(path) as f:
+        for line in f:
+            entry = parse_entry(line)
+            if entry:
+                entries.add(entry)
+    return entries
+
+
+def split_families(entries: Iterable[str]) -> Dict[int, List[str]]:
+    families: Dict[int, List[str]] = {4: [], 6: []}
+    for entry in entries:
+        families[6 if ":" in entry else 4].append(entry)
+    for members in families.values():
+        members.sort()
+    return families
+
+
+def restore_payload(name: str, family: str, entries: List[str], create_live: bool) -> str:
+    """Restore script that fills ``<name>_tmp`` and swaps it with ``name``."""
+    tmp = f"{name}_tmp"
+    maxelem = max(MIN_MAXELEM, 2 * len(entries))
+    lines = []
+    if create_live:
+        lines.append(f"create {name} hash:net family {family} maxelem {maxelem}")
+    lines.append(f"create {tmp} hash:net family {family} maxelem {maxelem} -exist")
+    lines.append(f"flush {tmp}")
+    lines.extend(f"add {tmp} {entry} -exist" for entry in entries)
+    lines.append(f"swap {tmp} {name}")
+    lines.append(f"destroy {tmp}")
+    return "\n".join(lines) + "\n"
+
+
+class FirewallSync:
+    """Keeps the ``known_bad_ips`` ipsets (IPv4 and ``known_bad_ips6``) equal to the block lists.
+
+    A sync sends one ``ipset restore`` payload that fills a temporary set per
+    family and swaps it with the live one, so the iptables DROP rule never
+    sees a missing or half-filled set and blocking stays continuous.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[str] = (FIREHOL_FILE, AI_BLOCK_FILE),
+        name: str = IPSET_NAME,
+        ipset_cmd: str = IPSET_CMD,
+        iptables_cmd: str = IPTABLES_CMD,
+        ip6tables_cmd: str = IP6TABLES_CMD,
+        sudo: bool = False,
+    ):
+        self.sources = list(sources)
+        self.sets = {4: name, 6: name + "6"}
+        self.ipset_cmd = ipset_cmd
+        self.iptables_cmds = {4: iptables_cmd, 6: ip6tables_cmd}
+        self.prefix = ["sudo", "-n"] if sudo else []
+        self._files: Dict[str, Tuple[Tuple[int, int, int], Set[str]]] = {}
+
+    def run(self, args: List[str], input: Optional[str] = None, check: bool = True) -> subprocess.CompletedProcess:
+        try:
+            result = subprocess.run(
+                self.prefix + args, input=input, capture_output=True, text=True, timeout=COMMAND_TIMEOUT
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise FirewallError(f"{args[0]} failed: {e}")
+        if check and result.returncode != 0:
+            raise FirewallError(f"{' '.join(args[:2])} failed: {result.stderr.strip()}")
+        return result
+
+    def desired(self) -> Set[str]:
+        """Union of the block lists; a file is only re-parsed when its (inode, size, mtime) changes."""
+        entries = set()
+        for path in self.sources:
+            try:
+                st = os.stat(path)
+                signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                print(f"[!] Block list not found: {path}")
+                continue
+            cached = self._files.get(path)
+            if cached is None or cached[0] != signature:
+                cached = self._files[path] = (signature, read_entries(path))
+            entries |= cached[1]
+        return entries
+
+    def existing_sets(self) -> Set[str]:
+        return set(self.run([self.ipset_cmd, "list", "-n"]).stdout.split())
+
+    def ensure_rule(self, version: int):
+        """Insert the DROP rule for a family's set unless present; skipped if its iptables is not installed."""
+        rule = ["INPUT", "-m", "set", "--match-set", self.sets[version], "src", "-j", "DROP"]
+        cmd = self.iptables_cmds[version]
+        if shutil.which(cmd) is None:
+            print(f"[!] {cmd} not found, no DROP rule for {self.sets[version]}")
+            return
+        if self.run([cmd, "-C"] + rule, check=False).returncode != 0:
+            self.run([cmd, "-I"] + rule)
+
+    def sync(self, entries: Optional[Iterable[str]] = None) -> Dict:
+        """Replace the live sets with ``entries`` (default: the block lists) in one restore.
+
+        A family is only touched if it has entries or its set already exists,
+        so an IPv4-only host never needs an IPv6 set or ip6tables.
+        """
+        started = time.perf_counter()
+        families = split_families(self.desired() if entries is None else entries)
+        existing = self.existing_sets()
+        versions = [version for version, members in families.items() if members or self.sets[version] in existing]
+        payload = "".join(
+            restore_payload(self.sets[version], "inet" if version == 4 else "inet6", families[version],
+                            self.sets[version] not in existing)
+            for version in versions
+        )
+        if payload:
+            self.run([self.ipset_cmd, "restore"], input=payload)
+        for version in versions:
+            self.ensure_rule(version)
+        return {
+            "ipv4": len(families[4]),
+            "ipv6": len(families[6]),
+            "elapsed": round(time.perf_counter() - started, 4),
+        }
+
+
+class FirewallReconciler(FirewallSync):
+    """Applies only the difference between the block lists and the live sets.
+
+    The kernel contents are read once with ``ipset save`` and cached. Before
+    each apply, the set headers (``ipset list -t``) are compared with the cache.
+    The full contents are re-read only when they disagree, when an apply fails,
+    or after ``max_age`` seconds. All adds and deletes go out in one
+    ``ipset restore``, so the cost follows the size of the change.
+    """
+
+    def __init__(self, *args, max_age: float = KERNEL_STATE_MAX_AGE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_age = max_age
+        self.kernel: Optional[Dict[int, Set[str]]] = None
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        """Forget the cached kernel state, e.g. after the sets were changed by another tool."""
+        self.kernel = None
+
+    def read_kernel(self) -> Dict[int, Set[str]]:
+        names = {name: version for version, name in self.sets.items()}
+        kernel: Dict[int, Set[str]] = {}
+        result = self.run([self.ipset_cmd, "save"])
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if len(parts) >= 2 and parts[1] in names:
+                if parts[0] == "create":
+                    kernel.setdefault(names[parts[1]], set())
+                elif parts[0] == "add" and len(parts) >= 3:
+                    kernel.setdefault(names[parts[1]], set()).add(parts[2])
+        return kernel
+
+    def headers(self) -> Dict[int, int]:
+        """Entry count of each live set, from ``ipset list -t``."""
+        names = {name: version for version, name in self.sets.items()}
+        counts: Dict[int, int] = {}
+        current = None
+        for line in self.run([self.ipset_cmd, "list", "-t"]).stdout.splitlines():
+            key, _, value = line.partition(":")
+            if key == "Name":
+                current = names.get(value.strip())
+            elif key == "Number of entries" and current is not None:
+                counts[current] = int(value)
+        return counts
+
+    def drifted(self) -> bool:
+        if self.kernel is None or time.monotonic() - self.loaded_at > self.max_age:
+            return True
+        return self.headers() != {version: len(members) for version, members in self.kernel.items()}
+
+    def refresh(self):
+        self.kernel = self.read_kernel()
+        self.loaded_at = time.monotonic()
+        for version in self.kernel:
+            self.ensure_rule(version)
+
+    def payload(self, desired: Dict[int, Set[str]]) -> Tuple[str, int, int]:
+        lines = []
+        added = removed = 0
+        for version, members in desired.items():
+            name = self.sets[version]
+            current = self.kernel.get(version)
+            if current is None:
+                if not members:
+                    continue
+                family = "inet" if version == 4 else "inet6"
+                lines.append(f"create {name} hash:net family {family} maxelem {max(MIN_MAXELEM, 2 * len(members))} -exist")
+                current = set()
+            for entry in sorted(current - members):
+                lines.append(f"del {name} {entry} -exist")
+                removed += 1
+            for entry in sorted(members - current):
+                lines.append(f"add {name} {entry} -exist")
+                added += 1
+        return "".join(line + "\n" for line in lines), added, removed
+
+    def reconcile(self, entries: Optional[Iterable[str]] = None) -> Dict:
+        """Bring the live sets to ``entries`` (default: the block lists); returns what changed."""
+        with self.lock:
+            started = time.perf_counter()
+            desired = {version: set(members) for version, members in
+                       split_families(self.desired() if entries is None else entries).items()}
+            refreshed = self.drifted()
+            if refreshed:
+                self.refresh()
+            payload, added, removed = self.payload(desired)
+            if payload:
+                try:
+                    self.run([self.ipset_cmd, "restore"], input=payload)
+                except FirewallError:
+                    # Our picture of the kernel was wrong; re-read it and retry once
+                    self.refresh()
+                    refreshed = True
+                    payload, added, removed = self.payload(desired)
+                    try:
+                        self.run([self.ipset_cmd, "restore"], input=payload)
+                    except FirewallError:
+                        self.invalidate()
+                        raise
+                created = [version for version, members in desired.items() if version not in self.kernel and members]
+                for version, members in desired.items():
+                    if version in self.kernel or members:
+                        self.kernel[version] = members
+                for version in created:
+                    self.ensure_rule(version)
+            return {
+                "added": added,
+                "removed": removed,
+                "total": sum(len(members) for members in desired.values()),
+                "refreshed": refreshed,
+                "elapsed": round(time.perf_counter() - started, 4),
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the block lists into ipset atomically")
+    parser.add_argument("command", choices=["sync", "reconcile"],
+                        help="sync: full atomic reload; reconcile: apply only the difference")
+    parser.add_argument("--source", action="append", help="block list file (repeatable; default firehol + AI)")
+    parser.add_argument("--sudo", action="store_true", help="prefix ipset/iptables with sudo -n")
+    args = parser.parse_args()
+
+    sources = args.source or (FIREHOL_FILE, AI_BLOCK_FILE)
+    try:
+        if args.command == "reconcile":
+            stats = FirewallReconciler(sources=sources, sudo=args.sudo).reconcile()
+            print(f"[OK] +{stats['added']} -{stats['removed']} ({stats['total']} entries) in {stats['elapsed']:.3f}s")
+            return
+        firewall = FirewallSync(sources=sources, sudo=args.sudo)
+        stats = firewall.sync()
+    except FirewallError as e:
+        print(f"[!] {e}")
+        sys.exit(1)
+    print(f"[OK] Loaded {stats['ipv4']} IPv4 and {stats['ipv6']} IPv6 entries into "
+          f"{firewall.sets[4]}/{firewall.sets[6]} in {stats['elapsed']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import random
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import geoip2.database
+    import geoip2.errors
+    from maxminddb import MODE_MMAP
+except ImportError:
+    geoip2 = None
+
+GEO_DB = "/home/ubuntu/idps/ip-blocker/datasets/geoip.mmdb"
+CACHE_SIZE = 65536
+UNKNOWN = "Unknown"
+
+
+def fallback_location(ip: str) -> Dict:
+    """Stable pseudo-random coordinates for an IP the database does not know."""
+    rng = random.Random(ip)
+    return {
+        "latitude": round(rng.uniform(-60, 70), 4),
+        "longitude": round(rng.uniform(-180, 180), 4),
+        "country": UNKNOWN,
+        "city": UNKNOWN,
+    }
+
+
+class GeoIP:
+    """City lookups against the GeoLite2 database, memory-mapped and LRU-cached per IP.
+
+    ``overrides`` maps IPs to fixed locations (the server's mock data) and wins
+    over the database. If geoip2 is not installed or the database file is
+    missing, every IP gets its fallback location. Returned dicts are shared
+    with the cache and must not be modified.
+    """
+
+    def __init__(self, path: str = GEO_DB, cache_size: int = CACHE_SIZE, overrides: Optional[Dict[str, Dict]] = None):
+        self.path = path
+        self.overrides = overrides or {}
+        self.reader = None
+        if geoip2 is None:
+            print("Warning: geoip2 is not installed; using fallback locations")
+        else:
+            try:
+                self.reader = geoip2.database.Reader(path, mode=MODE_MMAP)
+            except (OSError, ValueError) as e:
+                print(f"Warning: cannot open GeoIP database {path}: {e}")
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _lookup(self, ip: str) -> Dict:
+        if ip in self.overrides:
+            return self.overrides[ip]
+        if self.reader is not None and ip:
+            try:
+                r = self.reader.city(ip)
+            except (ValueError, geoip2.errors.AddressNotFoundError):
+                pass
+            else:
+                location = fallback_location(ip)
+                if r.location.latitude is not None:
+                    location["latitude"] = r.location.latitude
+                    location["longitude"] = r.location.longitude
+                location["country"] = r.country.name or UNKNOWN
+                location["city"] = r.city.name or UNKNOWN
+                return location
+        return fallback_location(ip or "")
+
+    def country(self, ip: str) -> str:
+        return self.lookup(ip)["country"]
+
+    def enrich(self, ips: Iterable[str], field: str = "country") -> List:
+        """``field`` for each IP of a column, looking up every distinct IP once."""
+        ips = list(ips)
+        values = {ip: self.lookup(ip)[field] for ip in set(ips)}
+        return [values[ip] for ip in ips]
+
+    def cache_info(self):
+        return self.lookup.cache_info()
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        self.lookup.cache_clear()
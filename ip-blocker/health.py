@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+SAMPLE_INTERVAL = 5.0
+HISTORY_SIZE = 720  # one hour at the default interval
+CONNECTIONS_EVERY = 6  # net_connections() walks every socket; refresh it every Nth sample
+
+
+class HealthSampler:
+    """Samples CPU, memory, connections and alert rate on a background thread.
+
+    Each sample is a plain dict kept in a ring buffer of ``history`` entries,
+    so the API answers from memory instead of blocking a request in
+    ``psutil.cpu_percent(interval=1)``. CPU usage is measured over the interval
+    between two samples (``cpu_percent(interval=None)``).
+    """
+
+    def __init__(
+        self,
+        alerts_per_minute: Callable[[], float],
+        interval: float = SAMPLE_INTERVAL,
+        history: int = HISTORY_SIZE,
+        connections_every: int = CONNECTIONS_EVERY,
+        ml_model_accuracy: float = 0.95,
+        on_sample: Optional[Callable[[Dict], None]] = None,
+    ):
+        self.alerts_per_minute = alerts_per_minute
+        self.interval = interval
+        self.connections_every = connections_every
+        self.ml_model_accuracy = ml_model_accuracy
+        self.on_sample = on_sample
+        self.samples = deque(maxlen=history)
+        self._connections = 0
+        self._count = 0
+        self._boot_time = psutil.boot_time()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        psutil.cpu_percent(interval=None)  # prime the CPU counter
+
+    def sample(self) -> Dict:
+        if self._count % self.connections_every == 0:
+            try:
+                self._connections = len(psutil.net_connections())
+            except psutil.AccessDenied:
+                pass
+        self._count += 1
+        now = time.time()
+        sample = {
+            "timestamp": now,
+            "cpu_usage": psutil.cpu_percent(interval=None),
+            "memory_usage": psutil.virtual_memory().percent,
+            "alerts_per_minute": self.alerts_per_minute(),
+            "ml_model_accuracy": self.ml_model_accuracy,
+            "active_connections": self._connections,
+            "uptime": now - self._boot_time,
+        }
+        self.samples.append(sample)
+        if self.on_sample is not None:
+            self.on_sample(sample)
+        return sample
+
+    def latest(self) -> Dict:
+        """Most recent sample; takes one synchronously if none exists yet."""
+        if not self.samples:
+            return self.sample()
+        return self.samples[-1]
+
+    def history(self, count: int) -> List[Dict]:
+        samples = list(self.samples)
+        return samples[-count:] if count > 0 else []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling system health: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
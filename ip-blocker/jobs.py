@@ -0,0 +1,111 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+COMMAND_TIMEOUT = 600
+MAX_JOBS = 200
+
+
+class CommandError(RuntimeError):
+    pass
+
+
+async def run_command(args: Sequence[str], timeout: float = COMMAND_TIMEOUT) -> str:
+    """Run a child process without blocking the event loop; returns stdout, raises CommandError."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except OSError as e:
+        raise CommandError(f"{args[0]}: {e}")
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise CommandError(f"{' '.join(args)} timed out after {timeout}s")
+    if proc.returncode != 0:
+        raise CommandError(f"{' '.join(args)} exited with {proc.returncode}: {stderr.decode().strip()}")
+    return stdout.decode()
+
+
+class Job:
+    __slots__ = ("id", "kind", "status", "created_at", "started_at", "finished_at", "result", "error", "task")
+
+    def __init__(self, job_id: str, kind: str):
+        self.id = job_id
+        self.kind = kind
+        self.status = "pending"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Runs long operations (rule updates, firewall pushes, Suricata start/stop) as asyncio tasks.
+
+    Jobs of one kind run one at a time, in submission order. For idempotent
+    kinds (``coalesce=True``: firewall sync, rules update) submitting while a
+    job of that kind is waiting to start returns the waiting job instead of
+    queueing another, since it will see the latest state anyway. The most recent
+    ``max_jobs`` jobs are kept for the status endpoint.
+    """
+
+    def __init__(self, max_jobs: int = MAX_JOBS):
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, kind: str, func: Callable[[], Awaitable], coalesce: bool = False) -> Job:
+        """Schedule ``func()`` on the running loop; call from a coroutine."""
+        if coalesce:
+            for job in reversed(self.jobs.values()):
+                if job.kind == kind and job.status == "pending":
+                    return job
+        job = Job(f"{kind}-{next(self._ids)}", kind)
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.max_jobs:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.status in ("pending", "running"):
+                break
+            self.jobs.popitem(last=False)
+        job.task = asyncio.get_running_loop().create_task(self._run(job, func))
+        return job
+
+    async def _run(self, job: Job, func: Callable[[], Awaitable]):
+        lock = self._locks.setdefault(job.kind, asyncio.Lock())
+        async with lock:
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await func()
+                job.status = "succeeded"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+                print(f"Job {job.id} failed: {e}")
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self, kind: Optional[str] = None) -> List[Dict]:
+        return [job.to_dict() for job in reversed(self.jobs.values()) if kind is None or job.kind == kind]
@@ -0,0 +1,282 @@
+import csv
+import io
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from alert_store import MAX_SCAN, parse_timestamp
+
+# merged_logs.csv is rotated to .1, .2, ... once it grows past MAX_BYTES, so
+# reloading it costs the same however long the detector has been running.
+MAX_BYTES = 64 * 1024 * 1024
+BACKUPS = 3
+TAIL_CHECK = 256  # bytes compared before an incremental reload
+
+FIELDS = ["src_ip", "dest_ip", "dest_port", "proto", "attack_type", "timestamp", "country", "proto_code", "anomaly"]
+
+
+def _optional(value: Optional[str], convert: Callable):
+    return convert(value) if value else None
+
+
+def parse_row(row: Dict[str, str]) -> Dict:
+    return {
+        "src_ip": row.get("src_ip", ""),
+        "dest_ip": row.get("dest_ip", ""),
+        "dest_port": _optional(row.get("dest_port"), lambda v: int(float(v))),
+        "proto": row.get("proto", ""),
+        "attack_type": row.get("attack_type", ""),
+        "timestamp": row.get("timestamp", ""),
+        "country": row.get("country"),
+        "proto_code": _optional(row.get("proto_code"), lambda v: int(float(v))),
+        "anomaly": _optional(row.get("anomaly"), float),
+    }
+
+
+def backup_paths(path: str, backups: int = BACKUPS) -> List[str]:
+    """Existing rotated copies of ``path``, oldest first."""
+    return [p for p in (f"{path}.{i}" for i in range(backups, 0, -1)) if os.path.exists(p)]
+
+
+def rotate(path: str, max_bytes: int = MAX_BYTES, backups: int = BACKUPS) -> bool:
+    """Shift ``path`` to ``path.1`` (dropping the oldest copy) once it exceeds ``max_bytes``."""
+    try:
+        if os.path.getsize(path) <= max_bytes:
+            return False
+    except FileNotFoundError:
+        return False
+    for i in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    if backups:
+        os.replace(path, f"{path}.1")
+    else:
+        os.remove(path)
+    print(f"Rotated {path} ({max_bytes} byte limit)")
+    return True
+
+
+class MergedLogs:
+    """One immutable view of merged_logs.csv: plain records, model rows, columns and a per-IP index.
+
+    The lists behind a view are append-only and shared with the views
+    ``extend`` derives from it, so picking up appended rows costs only those
+    rows. A view is bounded by its own ``length`` and never sees rows added
+    after it was published.
+    """
+
+    def __init__(self, records: List[Dict], row_factory: Optional[Callable] = None, base: Optional["MergedLogs"] = None):
+        if base is None:
+            self._records: List[Dict] = []
+            self.columns: Dict[str, list] = {name: [] for name in FIELDS}
+            self.columns["anomaly"] = array("d")
+            self._by_ip: Dict[str, List[int]] = {}
+            self._row_list: list = []
+            self._timestamp_list = array("q")
+            self._storage_lock = threading.Lock()
+        else:
+            if base.length != len(base._records):
+                raise ValueError("can only extend the newest view")
+            self._records, self.columns, self._by_ip = base._records, base.columns, base._by_ip
+            self._row_list, self._timestamp_list = base._row_list, base._timestamp_list
+            self._storage_lock = base._storage_lock
+        start = len(self._records)
+        for i, record in enumerate(records, start):
+            self._records.append(record)
+            for name in FIELDS:
+                value = record[name]
+                if name == "anomaly" and value is None:
+                    value = math.nan
+                self.columns[name].append(value)
+            self._by_ip.setdefault(record["src_ip"], []).append(i)
+            if record["dest_ip"] != record["src_ip"]:
+                self._by_ip.setdefault(record["dest_ip"], []).append(i)
+        self.length = len(self._records)
+        self._row_factory = row_factory
+
+    def extend(self, records: List[Dict]) -> "MergedLogs":
+        """A new view with ``records`` appended; this view is unchanged."""
+        return MergedLogs(records, self._row_factory, base=self)
+
+    @property
+    def records(self) -> List[Dict]:
+        """The shared record list; only indices below ``len(self)`` belong to this view."""
+        return self._records
+
+    @property
+    def rows(self) -> list:
+        with self._storage_lock:
+            factory = self._row_factory or dict
+            for record in self._records[len(self._row_list):self.length]:
+                self._row_list.append(factory(**record))
+        return self._row_list[:self.length]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _ip_indices(self, ip: str) -> List[int]:
+        indices = self._by_ip.get(ip, [])
+        return indices[:bisect_left(indices, self.length)]
+
+    def for_ip(self, ip: str) -> List[Dict]:
+        return [self._records[i] for i in self._ip_indices(ip)]
+
+    def ip_count(self, ip: str) -> int:
+        return bisect_left(self._by_ip.get(ip, []), self.length)
+
+    def count_anomaly_at_least(self, threshold: float) -> int:
+        anomaly = self.columns["anomaly"]
+        return sum(1 for i in range(self.length) if anomaly[i] >= threshold)
+
+    @property
+    def timestamps(self) -> array:
+        """Epoch microseconds per record, parsed on first use."""
+        with self._storage_lock:
+            column = self.columns["timestamp"]
+            for i in range(len(self._timestamp_list), self.length):
+                self._timestamp_list.append(parse_timestamp(column[i]))
+        return self._timestamp_list
+
+    def page(
+        self,
+        before: Optional[int] = None,
+        limit: int = 100,
+        ip: Optional[str] = None,
+        src_ip: Optional[str] = None,
+        dest_ip: Optional[str] = None,
+        signature: Optional[str] = None,
+        severity: Optional[int] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        max_scan: int = MAX_SCAN,
+    ) -> Tuple[List[int], Optional[int]]:
+        """Keyset page of record indices below ``before``, last row first (see ``AlertStore.page``)."""
+        if severity is not None:
+            return [], None  # detector rows carry no Suricata severity
+        top = self.length if before is None else min(before, self.length)
+        key = ip or src_ip or dest_ip
+        if key is not None:
+            indices = self._by_ip.get(key, [])
+            candidates = (indices[i] for i in range(bisect_left(indices, top) - 1, -1, -1))
+        else:
+            candidates = range(top - 1, -1, -1)
+        columns = self.columns
+        timestamps = self.timestamps if start is not None or end is not None else None
+        result, scanned = [], 0
+        for i in candidates:
+            scanned += 1
+            if (
+                (src_ip is None or columns["src_ip"][i] == src_ip)
+                and (dest_ip is None or columns["dest_ip"][i] == dest_ip)
+                and (signature is None or columns["attack_type"][i] == signature)
+                and (start is None or timestamps[i] >= start)
+                and (end is None or timestamps[i] < end)
+            ):
+                result.append(i)
+                if len(result) == limit:
+                    return result, i
+            if scanned >= max_scan:
+                return result, i
+        return result, None
+
+
+class MergedLogCache:
+    """Keeps the parsed merged_logs.csv in memory and reloads it only when the file changes.
+
+    A change is detected by (inode, size, mtime). When the inode is unchanged
+    and the file only grew (the detector's O_APPEND writes), just the bytes
+    after the last parsed line are read and the snapshot is extended,
+    provided the bytes before them are still what was parsed last; otherwise
+    (rewrite, rotation, truncation) the file is parsed in full. A trailing
+    line without its newline is left for the next reload. The new
+    snapshot is published with a single reference swap, and a full parse only
+    if the file's identity did not move while it was being read, so a
+    half-written CSV is never served; the previous snapshot is kept instead.
+    """
+
+    def __init__(self, path: str, row_factory: Optional[Callable] = None, retries: int = 3):
+        self.path = path
+        self.row_factory = row_factory
+        self.retries = retries
+        self._snapshot = MergedLogs([], row_factory)
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._offset = 0  # bytes parsed into the snapshot
+        self._header: Optional[List[str]] = None
+        self._tail = b""  # last bytes parsed, checked before an incremental read
+        self.generation = 0  # bumped whenever a new snapshot is published
+        self._lock = threading.Lock()
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _read(self, offset: int, header: Optional[List[str]], tail: bytes):
+        """Complete lines from ``offset``: (records, bytes consumed, header, new tail).
+
+        None when the bytes just before ``offset`` are not ``tail``, the end of
+        what was parsed last: the path now names another file on a reused inode.
+        """
+        with open(self.path, "rb") as f:
+            f.seek(offset - len(tail))
+            if f.read(len(tail)) != tail:
+                return None
+            data = f.read()
+        consumed = data.rfind(b"\n") + 1
+        reader = csv.DictReader(io.StringIO(data[:consumed].decode(), newline=""), fieldnames=header)
+        records = [parse_row(row) for row in reader]
+        return records, consumed, header or reader.fieldnames, (tail + data[:consumed])[-TAIL_CHECK:]
+
+    def current(self) -> MergedLogs:
+        """The last loaded snapshot, without touching the file (for request handlers)."""
+        return self._snapshot
+
+    def _publish(self, snapshot: MergedLogs, signature, offset: int = 0, header=None, tail: bytes = b""):
+        self._snapshot, self._signature = snapshot, signature
+        self._offset, self._header, self._tail = offset, header, tail
+        self.generation += 1
+
+    def get(self) -> MergedLogs:
+        signature = self._stat()
+        if signature == self._signature:
+            return self._snapshot
+        with self._lock:
+            for _ in range(self.retries):
+                signature = self._stat()
+                if signature == self._signature:
+                    break
+                if signature is None:
+                    print(f"Warning: {self.path} does not exist")
+                    self._publish(MergedLogs([], self.row_factory), None)
+                    break
+                result = None
+                try:
+                    if (self._signature is not None and self._header is not None
+                            and signature[0] == self._signature[0] and signature[1] >= self._offset):
+                        result = self._read(self._offset, self._header, self._tail)
+                    if result is not None:
+                        records, consumed, header, tail = result
+                        current = self._stat()
+                        if current is None or current[0] != signature[0] or current[1] < self._offset + consumed:
+                            continue  # replaced or truncated while we were reading it
+                        # Rows appended after our read are picked up by the next reload
+                        snapshot = self._snapshot.extend(records) if records else self._snapshot
+                        self._publish(snapshot, signature, self._offset + consumed, header, tail)
+                        if records:
+                            print(f"Loaded {len(records)} appended rows from {self.path}")
+                        break
+                    records, consumed, header, tail = self._read(0, None, b"")
+                except (OSError, ValueError, csv.Error) as e:
+                    print(f"Error reading {self.path}: {e}")
+                    continue
+                if self._stat() != signature:
+                    continue  # rewritten while we were reading it
+                self._publish(MergedLogs(records, self.row_factory), signature, consumed, header, tail)
+                print(f"Loaded {len(records)} rows from {self.path}")
+                break
+            return self._snapshot
@@ -0,0 +1,343 @@
+import glob
+import multiprocessing
+import os
+import socket
+import struct
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+BATCH_SIZE = 50_000
+COLUMNS = ["src_ip", "dest_ip", "dest_port", "proto", "timestamp"]
+DONE = -1
+
+# Link-layer types we can decode (see pcap-linktype(7)).
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+IP_PROTOCOLS = {1: "ICMP", 6: "TCP", 17: "UDP", 58: "IPv6-ICMP", 132: "SCTP"}
+PORT_PROTOCOLS = {6, 17, 132}
+
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+
+
+class PcapFormatError(ValueError):
+    pass
+
+
+def _network_offset(linktype: int, frame: bytes) -> Tuple[int, int]:
+    """(offset of the IP header, ethertype-ish version hint) for one frame; -1 if not IP."""
+    if linktype == LINKTYPE_ETHERNET:
+        offset, ethertype = 14, struct.unpack_from("!H", frame, 12)[0] if len(frame) >= 14 else 0
+        while ethertype in (0x8100, 0x88A8) and len(frame) >= offset + 4:  # VLAN tags
+            ethertype = struct.unpack_from("!H", frame, offset + 2)[0]
+            offset += 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        offset, ethertype = 16, struct.unpack_from("!H", frame, 14)[0] if len(frame) >= 16 else 0
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        offset, ethertype = 20, struct.unpack_from("!H", frame, 0)[0] if len(frame) >= 20 else 0
+    elif linktype == LINKTYPE_NULL:
+        offset, ethertype = 4, 0x0800 if frame[:4] in (b"\x02\x00\x00\x00", b"\x00\x00\x00\x02") else 0x86DD
+    elif linktype in (LINKTYPE_RAW, 12, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        offset, ethertype = 0, 0x0800 if frame[:1] and frame[0] >> 4 == 4 else 0x86DD
+    else:
+        return -1, 0
+    return (offset, ethertype) if ethertype in (0x0800, 0x86DD) else (-1, 0)
+
+
+def decode_frame(linktype: int, frame: bytes) -> Optional[Tuple[str, str, int, str]]:
+    """(src_ip, dest_ip, dest_port, proto) of an IPv4/IPv6 frame, or None."""
+    offset, ethertype = _network_offset(linktype, frame)
+    if offset < 0:
+        return None
+    if ethertype == 0x0800:
+        if len(frame) < offset + 20:
+            return None
+        ihl = (frame[offset] & 0x0F) * 4
+        proto = frame[offset + 9]
+        src = socket.inet_ntop(socket.AF_INET, frame[offset + 12:offset + 16])
+        dst = socket.inet_ntop(socket.AF_INET, frame[offset + 16:offset + 20])
+        fragment = struct.unpack_from("!H", frame, offset + 6)[0] & 0x1FFF
+        transport = offset + ihl if not fragment else -1
+    else:
+        if len(frame) < offset + 40:
+            return None
+        proto = frame[offset + 6]
+        src = socket.inet_ntop(socket.AF_INET6, frame[offset + 8:offset + 24])
+        dst = socket.inet_ntop(socket.AF_INET6, frame[offset + 24:offset + 40])
+        transport = offset + 40
+    port = 0
+    if proto in PORT_PROTOCOLS and 0 <= transport and len(frame) >= transport + 4:
+        port = struct.unpack_from("!H", frame, transport + 2)[0]
+    return src, dst, port, IP_PROTOCOLS.get(proto, str(proto))
+
+
+def _format_ts(seconds: int, fraction: int, resolution: int) -> str:
+    micros = fraction * 1_000_000 // resolution
+    dt = datetime.fromtimestamp(seconds, timezone.utc).replace(microsecond=micros)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f+0000")
+
+
+def _new_columns() -> Dict[str, list]:
+    return {name: [] for name in COLUMNS}
+
+
+def _append(columns: Dict[str, list], decoded: Tuple[str, str, int, str], timestamp: str):
+    columns["src_ip"].append(decoded[0])
+    columns["dest_ip"].append(decoded[1])
+    columns["dest_port"].append(decoded[2])
+    columns["proto"].append(decoded[3])
+    columns["timestamp"].append(timestamp)
+
+
+def _read_classic(f, header: bytes, offset: int, batch_size: int) -> Tuple[Dict[str, list], int, str]:
+    magic = header[:4]
+    if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+        endian = "<"
+    else:
+        endian = ">"
+    resolution = 1_000_000_000 if magic in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d") else 1_000_000
+    linktype = struct.unpack(endian + "I", header[20:24])[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + "IIII")
+
+    columns = _new_columns()
+    position = f.seek(max(offset, 24))
+    packets = 0
+    while packets < batch_size:
+        head = f.read(16)
+        if not head:
+            return columns, DONE, ""
+        if len(head) < 16:
+            return columns, position, ""  # record still being written; resume at its start
+        ts_sec, ts_frac, incl_len, _ = record.unpack(head)
+        frame = f.read(incl_len)
+        if len(frame) < incl_len:
+            return columns, position, ""
+        position += 16 + incl_len
+        packets += 1
+        decoded = decode_frame(linktype, frame)
+        if decoded:
+            _append(columns, decoded, _format_ts(ts_sec, ts_frac, resolution))
+    return columns, position, ""
+
+
+def _pcapng_state(endian: str, interfaces: List[Tuple[int, int]]) -> str:
+    """The section's byte order and interface table, saved with the offset to resume from."""
+    return endian + ",".join(f"{linktype}/{resolution}" for linktype, resolution in interfaces)
+
+
+def _parse_pcapng_state(state: str) -> Tuple[str, List[Tuple[int, int]]]:
+    interfaces = []
+    for item in state[1:].split(","):
+        if item:
+            linktype, _, resolution = item.partition("/")
+            interfaces.append((int(linktype), int(resolution)))
+    return state[0], interfaces
+
+
+def _read_pcapng(f, offset: int, batch_size: int, state: str = "") -> Tuple[Dict[str, list], int, str]:
+    columns = _new_columns()
+    interfaces: List[Tuple[int, int]] = []  # (linktype, ticks per second) per interface id
+    endian = "<"
+    packets = 0
+    position = 0
+    if offset and state:
+        endian, interfaces = _parse_pcapng_state(state)
+        position = offset
+    f.seek(position)
+    while packets < batch_size:
+        head = f.read(12)
+        if not head:
+            return columns, DONE, ""
+        if len(head) < 12:
+            return columns, position, _pcapng_state(endian, interfaces)  # block still being written
+        if head[:4] == b"\x0a\x0d\x0d\x0a":
+            endian = "<" if head[8:12] == b"\x4d\x3c\x2b\x1a" else ">"
+            interfaces = []
+        block_type, block_len = struct.unpack(endian + "II", head[:8])
+        if block_len < 12 or block_len % 4:
+            raise PcapFormatError(f"bad pcapng block length {block_len}")
+        packet = block_type in (PCAPNG_EPB, PCAPNG_SPB)
+        if packet and position < offset:
+            # Progress saved without an interface table: skip what earlier batches read.
+            position = f.seek(position + block_len)
+            continue
+        body = head[8:] + f.read(block_len - 12)
+        if len(body) < block_len - 8:
+            return columns, position, _pcapng_state(endian, interfaces)
+        position += block_len
+        if block_type == PCAPNG_IDB:
+            linktype = struct.unpack_from(endian + "H", body, 0)[0]
+            interfaces.append((linktype, _pcapng_resolution(body[8:-4], endian)))
+        elif block_type == PCAPNG_EPB:
+            iface, ts_high, ts_low, cap_len = struct.unpack_from(endian + "IIII", body, 0)
+            linktype, resolution = interfaces[iface] if iface < len(interfaces) else (LINKTYPE_ETHERNET, 1_000_000)
+            packets += 1
+            decoded = decode_frame(linktype, body[20:20 + cap_len])
+            if decoded:
+                ticks = (ts_high << 32) | ts_low
+                _append(columns, decoded, _format_ts(ticks // resolution, ticks % resolution, resolution))
+        elif block_type == PCAPNG_SPB:
+            # Simple packet blocks carry no timestamp.
+            linktype = interfaces[0][0] if interfaces else LINKTYPE_ETHERNET
+            packets += 1
+            decoded = decode_frame(linktype, body[4:-4])
+            if decoded:
+                _append(columns, decoded, "")
+    return columns, position, _pcapng_state(endian, interfaces)
+
+
+def _pcapng_resolution(options: bytes, endian: str) -> int:
+    i = 0
+    while i + 4 <= len(options):
+        code, length = struct.unpack_from(endian + "HH", options, i)
+        if code == 0:
+            break
+        if code == 9 and length == 1:  # if_tsresol
+            value = options[i + 4]
+            return 2 ** (value & 0x7F) if value & 0x80 else 10 ** value
+        i += 4 + (length + 3) // 4 * 4
+    return 1_000_000
+
+
+def read_batch(path: str, offset: int = 0, batch_size: int = BATCH_SIZE,
+               state: str = "") -> Tuple[Dict[str, list], int, str]:
+    """Decode up to ``batch_size`` packets of a capture starting at byte ``offset``.
+
+    Returns the records as columns, the offset to resume from and the reader
+    state to pass back with it: for pcapng the byte order and interface table
+    seen so far, so the next batch seeks straight to ``offset``. The offset is
+    DONE only at a clean end of file; a record still being written is left
+    for the next call. Runs in pool workers, so it only touches the file
+    system and the standard library.
+    """
+    with open(path, "rb") as f:
+        header = f.read(24)
+        if len(header) < 4:
+            return _new_columns(), offset, state  # header not written yet
+        if struct.unpack("<I", header[:4])[0] == PCAPNG_SHB:
+            return _read_pcapng(f, offset, batch_size, state)
+        if header[:4] in (b"\xd4\xc3\xb2\xa1", b"\xa1\xb2\xc3\xd4", b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d"):
+            return _read_classic(f, header, offset, batch_size)
+    raise PcapFormatError(f"{path} is not a pcap or pcapng file")
+
+
+class PcapIngestor:
+    """Decodes new captures in a process pool, one in-flight batch per file.
+
+    Progress lives in ``progress_file`` (processed_pcaps.txt): a finished capture
+    is listed by path as before, a partly read one as ``path<TAB>offset`` (plus
+    ``<TAB>state`` for pcapng, see ``read_batch``). Progress
+    advances in memory as batches are consumed and is written by ``commit()``, so
+    a caller can persist it only once the batches' results are safely stored;
+    after a restart a half-processed file resumes at its last committed batch.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        progress_file: str,
+        workers: Optional[int] = None,
+        batch_size: int = BATCH_SIZE,
+        max_batches: int = 20,
+        patterns: Tuple[str, ...] = ("*.pcap", "*.pcapng"),
+    ):
+        self.folder = folder
+        self.progress_file = progress_file
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.patterns = patterns
+        self.progress: Dict[str, Tuple[int, str]] = {}  # path -> (offset, reader state)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.progress_file):
+            return
+        with open(self.progress_file) as f:
+            for line in f:
+                path, _, rest = line.rstrip("\n").partition("\t")
+                offset, _, state = rest.partition("\t")
+                if path:
+                    self.progress[path] = (int(offset) if offset else DONE, state)
+
+    def commit(self):
+        tmp_path = self.progress_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            for path, (offset, state) in self.progress.items():
+                if offset == DONE:
+                    f.write(path + "\n")
+                else:
+                    f.write(f"{path}\t{offset}\t{state}\n" if state else f"{path}\t{offset}\n")
+        os.replace(tmp_path, self.progress_file)
+
+    def pending(self) -> List[Tuple[str, int, str]]:
+        files = sorted(set(p for pattern in self.patterns for p in glob.glob(os.path.join(self.folder, pattern))))
+        started = [(path,) + self.progress.get(path, (0, "")) for path in files]
+        return [entry for entry in started if entry[1] != DONE]
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: the server process is multi-threaded, so forking it is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def ingest(self, on_batch: Callable[[str, Dict[str, list]], None]) -> int:
+        """Feed up to ``max_batches`` decoded batches to ``on_batch``; returns the packet count."""
+        queue = self.pending()
+        if not queue:
+            return 0
+        in_flight: Dict[Future, Tuple[str, int, ProcessPoolExecutor]] = {}
+        submitted = 0
+        packets = 0
+
+        def submit(path: str, offset: int, state: str):
+            nonlocal submitted
+            pool = self._executor()
+            in_flight[pool.submit(read_batch, path, offset, self.batch_size, state)] = (path, offset, pool)
+            submitted += 1
+
+        while queue and len(in_flight) < self.workers and submitted < self.max_batches:
+            submit(*queue.pop(0))
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, offset, pool = in_flight.pop(future)
+                next_offset, state = DONE, ""
+                try:
+                    columns, next_offset, state = future.result()
+                    on_batch(path, columns)
+                    packets += len(columns["src_ip"])
+                    self.progress[path] = (next_offset, state)
+                except Exception as e:
+                    # Whatever broke this batch would break it again every cycle
+                    print(f"[!] Skipping PCAP {path}: {type(e).__name__}: {e}")
+                    next_offset = DONE
+                    self.progress[path] = (DONE, "")
+                    if isinstance(e, BrokenProcessPool) and pool is self._pool:
+                        pool.shutdown(wait=False)
+                        self._pool = None  # the next submit starts a fresh pool
+                finally:
+                    # A failed batch must not stall the files queued behind it
+                    if submitted < self.max_batches:
+                        if next_offset not in (DONE, offset):
+                            submit(path, next_offset, state)
+                        elif queue:
+                            # Done, or waiting for the capture's next record to be written
+                            submit(*queue.pop(0))
+        return packets
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
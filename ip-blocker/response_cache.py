@@ -0,0 +1,63 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from serialization import EncodedBody
+
+MAX_ENTRIES = 256
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag of a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """Serialized read responses keyed by (endpoint, params), valid for one data generation.
+
+    ``generation`` is a tuple of counters the response was computed from
+    (alert seq, blocklist generation, merged-logs generation, ...); an entry
+    is only served while the current counters are equal, so nothing is ever
+    invalidated explicitly. Entries are evicted least recently used beyond
+    ``max_entries``. Bodies are kept as EncodedBody, so their compressed
+    variants are also built once per generation rather than per request.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Tuple[tuple, EncodedBody]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, generation: tuple) -> Optional[EncodedBody]:
+        """The body cached for this generation, if any."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, generation: tuple, raw: bytes) -> EncodedBody:
+        body = EncodedBody(raw, make_etag(raw))
+        with self._lock:
+            self.entries[key] = (generation, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return body
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,136 @@
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Per-alert risk contribution by Suricata severity, in tenths so sums stay exact.
+SEVERITY_SCORES = {1: 9, 2: 7, 3: 4, 4: 2}
+DEFAULT_SCORE = 1
+THREAT_LEVELS = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "MINIMAL"]
+
+
+def get_threat_level(risk_score: float) -> str:
+    if risk_score >= 0.8:
+        return "CRITICAL"
+    elif risk_score >= 0.6:
+        return "HIGH"
+    elif risk_score >= 0.4:
+        return "MEDIUM"
+    elif risk_score >= 0.2:
+        return "LOW"
+    else:
+        return "MINIMAL"
+
+
+class IPRisk:
+    __slots__ = ("alert_count", "score_sum", "severity_sum", "last_seen", "category", "bucket")
+
+    def __init__(self):
+        self.alert_count = 0
+        self.score_sum = 0
+        self.severity_sum = 0
+        self.last_seen = 0
+        self.category: Optional[str] = None
+        self.bucket = -1
+
+    @property
+    def risk_score(self) -> float:
+        return self.bucket / 1000
+
+
+class RiskAggregator:
+    """Running per-IP risk aggregates with an incrementally maintained ranking.
+
+    An IP's risk score is its mean per-alert severity score, rounded to three
+    decimals, so it can only take 1001 values. IPs are kept in one bucket per
+    value (insertion-ordered), which makes top-K a walk down from the highest
+    non-empty bucket, and the threat-level histogram and score total are
+    adjusted whenever an IP changes bucket.
+    """
+
+    def __init__(self):
+        self._ips: Dict[str, IPRisk] = {}
+        self._buckets: List[Dict[str, None]] = [{} for _ in range(1001)]
+        self._threat_levels = Counter({level: 0 for level in THREAT_LEVELS})
+        self._bucket_total = 0
+        self.lock = threading.Lock()
+
+    def _rebucket(self, ip: str, risk: IPRisk):
+        if risk.alert_count:
+            bucket = min(round(risk.score_sum * 100 / risk.alert_count), 1000)
+        else:
+            bucket = -1
+        if bucket == risk.bucket:
+            return
+        if risk.bucket >= 0:
+            del self._buckets[risk.bucket][ip]
+            self._threat_levels[get_threat_level(risk.risk_score)] -= 1
+            self._bucket_total -= risk.bucket
+        risk.bucket = bucket
+        if bucket >= 0:
+            self._buckets[bucket][ip] = None
+            self._threat_levels[get_threat_level(risk.risk_score)] += 1
+            self._bucket_total += bucket
+
+    def add(self, ips: Tuple[Optional[str], ...], severity: Optional[int], timestamp: int, category: Optional[str]):
+        """Account one alert to each distinct IP in ``ips`` (source and destination)."""
+        score = SEVERITY_SCORES.get(severity, DEFAULT_SCORE)
+        with self.lock:
+            for ip in set(ips):
+                if ip is None:
+                    continue
+                risk = self._ips.get(ip)
+                if risk is None:
+                    risk = self._ips[ip] = IPRisk()
+                risk.alert_count += 1
+                risk.score_sum += score
+                risk.severity_sum += 5 - (severity or 4)
+                risk.last_seen = max(risk.last_seen, timestamp)
+                risk.category = category
+                self._rebucket(ip, risk)
+
+    def remove(self, ips: Tuple[Optional[str], ...], severity: Optional[int]):
+        """Take an evicted alert back out of its IPs' aggregates."""
+        score = SEVERITY_SCORES.get(severity, DEFAULT_SCORE)
+        with self.lock:
+            for ip in set(ips):
+                risk = self._ips.get(ip)
+                if risk is None:
+                    continue
+                risk.alert_count -= 1
+                risk.score_sum -= score
+                risk.severity_sum -= 5 - (severity or 4)
+                self._rebucket(ip, risk)
+                if not risk.alert_count:
+                    del self._ips[ip]
+
+    def _snapshot(self, ip: str, risk: IPRisk) -> Dict:
+        return {
+            "ip": ip,
+            "risk_score": risk.risk_score,
+            "alert_count": risk.alert_count,
+            "severity_sum": risk.severity_sum,
+            "last_seen": risk.last_seen,
+            "category": risk.category,
+        }
+
+    def get(self, ip: str) -> Optional[Dict]:
+        with self.lock:
+            risk = self._ips.get(ip)
+            return self._snapshot(ip, risk) if risk else None
+
+    def top(self, k: int = 10) -> List[Dict]:
+        result = []
+        with self.lock:
+            for bucket in range(1000, -1, -1):
+                for ip in self._buckets[bucket]:
+                    result.append(self._snapshot(ip, self._ips[ip]))
+                    if len(result) == k:
+                        return result
+        return result
+
+    def statistics(self) -> Tuple[int, float, Dict[str, int]]:
+        """(total IPs, average risk score, IP count per threat level)."""
+        with self.lock:
+            total_ips = len(self._ips)
+            average = self._bucket_total / 1000 / max(total_ips, 1)
+            return total_ips, average, dict(self._threat_levels)
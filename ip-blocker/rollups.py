@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, Optional, Tuple
+
+# Bucket width and how long buckets are kept, both in seconds.
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+RETENTION = {"minute": 26 * 3600, "hour": 100 * 86400, "day": 1100 * 86400}
+DIMENSIONS = ["signature", "category", "country", "severity"]
+
+
+class RollupBucket:
+    __slots__ = ["total"] + DIMENSIONS
+
+    def __init__(self):
+        self.total = 0
+        for name in DIMENSIONS:
+            setattr(self, name, Counter())
+
+    def add(self, values: Dict[str, str]):
+        self.total += 1
+        for name in DIMENSIONS:
+            getattr(self, name)[values[name]] += 1
+
+    def merge(self, other: "RollupBucket"):
+        self.total += other.total
+        for name in DIMENSIONS:
+            getattr(self, name).update(getattr(other, name))
+
+    def to_json(self) -> Dict:
+        data = {name: dict(getattr(self, name)) for name in DIMENSIONS}
+        data["total"] = self.total
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "RollupBucket":
+        bucket = cls()
+        bucket.total = data.get("total", 0)
+        for name in DIMENSIONS:
+            getattr(bucket, name).update(data.get(name, {}))
+        return bucket
+
+
+class AlertRollups:
+    """Per-minute, per-hour and per-day alert counts by signature, category, country and severity.
+
+    Buckets are filled at ingest and persisted to ``path`` together with the
+    eve.json position (inode, offset) they cover, so after a restart the replayed
+    part of the file is not counted twice. ``summary()`` answers any range by
+    merging the coarsest buckets that fit, so its cost depends on the number of
+    buckets touched rather than on the number of alerts. Range edges older than
+    a resolution's retention are widened to the next coarser bucket boundary.
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 30.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.buckets: Dict[str, Dict[int, RollupBucket]] = {name: {} for name in RESOLUTIONS}
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self._resume: Tuple[Optional[int], int] = (None, 0)
+        self._replayed = 0  # offset of the last event found already counted
+        self._last_flush = time.time()
+        self._dirty = False
+        self.lock = threading.Lock()
+        self.load()
+
+    def covers(self, inode: Optional[int], offset: int) -> bool:
+        """True if the event ending at ``offset`` was already counted before the last restart.
+
+        Replay reads the file forward, so the resume point is dropped at the
+        first event past it, or when offsets go backwards (the file was
+        truncated and refilled): nothing after that can have been counted.
+        """
+        resume_inode, resume_offset = self._resume
+        if resume_inode is None:
+            return False
+        if inode == resume_inode and self._replayed <= offset <= resume_offset:
+            self._replayed = offset
+            return True
+        self.forget_resume()
+        return False
+
+    def forget_resume(self):
+        """Count everything from now on (call when eve.json is truncated or replaced)."""
+        self._resume = (None, 0)
+
+    def add(self, timestamp: int, values: Dict[str, str], inode: Optional[int] = None, offset: int = 0):
+        """Count one alert; ``timestamp`` is in seconds, ``values`` maps each dimension to a key."""
+        with self.lock:
+            for name, width in RESOLUTIONS.items():
+                start = timestamp - timestamp % width
+                bucket = self.buckets[name].get(start)
+                if bucket is None:
+                    bucket = self.buckets[name][start] = RollupBucket()
+                bucket.add(values)
+            if inode is not None:
+                self.inode, self.offset = inode, offset
+            self._dirty = True
+
+    def _cover(self, start: int, end: int, now: int) -> Iterator[Tuple[str, int]]:
+        t = start - start % RESOLUTIONS["minute"]
+        while t < end:
+            for name in ("day", "hour", "minute"):
+                width = RESOLUTIONS[name]
+                if t % width == 0 and t + width <= end:
+                    break
+            else:
+                name = "minute"
+            # Fall back to coarser buckets where finer ones have been pruned.
+            while name != "day" and t < now - RETENTION[name]:
+                name = "hour" if name == "minute" else "day"
+                t -= t % RESOLUTIONS[name]
+            yield name, t
+            t += RESOLUTIONS[name]
+
+    def summary(self, start: int, end: Optional[int] = None) -> RollupBucket:
+        """Merged counts for alerts with start <= timestamp < end (seconds, minute resolution)."""
+        now = int(time.time())
+        end = now + 1 if end is None else end
+        result = RollupBucket()
+        with self.lock:
+            for name, t in self._cover(start, end, now):
+                bucket = self.buckets[name].get(t)
+                if bucket is not None:
+                    result.merge(bucket)
+        return result
+
+    def prune(self, now: Optional[int] = None):
+        now = int(time.time()) if now is None else now
+        with self.lock:
+            for name, buckets in self.buckets.items():
+                oldest = now - RETENTION[name] - RESOLUTIONS[name]
+                for t in [t for t in buckets if t < oldest]:
+                    del buckets[t]
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            for name in RESOLUTIONS:
+                self.buckets[name] = {
+                    int(t): RollupBucket.from_json(bucket)
+                    for t, bucket in data.get("buckets", {}).get(name, {}).items()
+                }
+            self.inode = data.get("inode")
+            self.offset = data.get("offset", 0)
+            self._resume = (self.inode, self.offset)
+        except (ValueError, OSError) as e:
+            print(f"Error reading rollups from {self.path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        self.prune()
+        with self.lock:
+            data = {
+                "inode": self.inode,
+                "offset": self.offset,
+                "buckets": {
+                    name: {str(t): bucket.to_json() for t, bucket in buckets.items()}
+                    for name, buckets in self.buckets.items()
+                },
+            }
+            self._dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error writing rollups to {self.path}: {e}")
+        self._last_flush = time.time()
+
+    def maybe_save(self):
+        if self._dirty and time.time() - self._last_flush >= self.flush_interval:
+            self.save()
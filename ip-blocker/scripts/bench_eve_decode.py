@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eve_decoder import BACKENDS, EveDecoder
+
+# Rough event mix of a production eve.json: alerts are a small minority.
+EVENT_MIX = [("flow", 0.55), ("dns", 0.15), ("http", 0.1), ("tls", 0.08), ("stats", 0.07), ("alert", 0.05)]
+
+
+def synthetic_event(event_type: str) -> dict:
+    event = {
+        "timestamp": "2025-10-15T15:57:38.683656+0000",
+        "flow_id": random.getrandbits(48),
+        "in_iface": "eth0",
+        "event_type": event_type,
+        "src_ip": f"10.0.{random.randint(0, 255)}.{random.randint(1, 254)}",
+        "src_port": random.randint(1024, 65535),
+        "dest_ip": "172.31.38.160",
+        "dest_port": random.choice([22, 80, 443, 8000]),
+        "proto": "TCP",
+    }
+    if event_type == "alert":
+        event["alert"] = {
+            "action": "allowed", "gid": 1, "signature_id": 2024143, "rev": 3,
+            "signature": "ET SCAN Potential SSH Scan", "category": "Attempted Information Leak", "severity": 2,
+        }
+    elif event_type == "flow":
+        event["flow"] = {"pkts_toserver": 12, "pkts_toclient": 10, "bytes_toserver": 1800, "bytes_toclient": 5400,
+                         "start": event["timestamp"], "end": event["timestamp"], "age": 3, "state": "closed"}
+    elif event_type == "stats":
+        event["stats"] = {"uptime": 3600, "capture": {"kernel_packets": 123456, "kernel_drops": 0},
+                          "decoder": {name: random.randint(0, 10 ** 6) for name in ("pkts", "bytes", "ipv4", "tcp", "udp")}}
+    else:
+        event[event_type] = {"hostname": "example.com", "rrname": "example.com", "url": "/index.html", "status": 200}
+    return event
+
+
+def write_synthetic(path: str, lines: int):
+    types, weights = zip(*EVENT_MIX)
+    with open(path, "w") as f:
+        for event_type in random.choices(types, weights, k=lines):
+            f.write(json.dumps(synthetic_event(event_type), separators=(",", ":")) + "\n")
+
+
+def run(path: str, decoder: EveDecoder) -> tuple:
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        matched = sum(1 for line in f if decoder.decode(line) is not None)
+    elapsed = time.perf_counter() - start
+    return matched, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark eve.json decoders on a synthetic log")
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--event-types", default="alert", help="comma-separated event types to keep")
+    args = parser.parse_args()
+
+    random.seed(42)
+    event_types = args.event_types.split(",")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "eve.json")
+        write_synthetic(path, args.lines)
+        print(f"Synthetic eve.json: {args.lines} lines, {os.path.getsize(path) / 1e6:.1f} MB, keeping {event_types}")
+        for backend in BACKENDS:
+            for prefilter in (False, True):
+                decoder = EveDecoder(event_types, backend=backend, prefilter=prefilter)
+                matched, elapsed = run(path, decoder)
+                label = f"{backend}{' + prefilter' if prefilter else ''}"
+                print(f"{label:<20} {args.lines / elapsed:>12,.0f} lines/s  ({matched} events, {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
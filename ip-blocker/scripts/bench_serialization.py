@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from alert_store import AlertStore, format_timestamp
+from serialization import COMPRESSORS, ENCODERS
+
+SIGNATURES = ["ET SCAN Potential SSH Scan", "ET POLICY Suspicious inbound to mySQL port 3306",
+              "GPL ICMP_INFO PING *NIX", "ET DROP Dshield Block Listed Source"]
+CATEGORIES = ["Attempted Information Leak", "Potentially Bad Traffic", "Misc activity", "Misc Attack"]
+
+
+def synthetic_alerts(count: int) -> list:
+    """Decoded rows as the alert endpoints serve them, taken from a filled AlertStore."""
+    store = AlertStore()
+    base = 1_760_000_000_000_000
+    for i in range(count):
+        store.append({
+            "timestamp": format_timestamp(base + i * 1000),
+            "src_ip": f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}",
+            "src_port": random.randint(1024, 65535),
+            "dest_ip": "172.31.38.160",
+            "dest_port": random.choice([22, 80, 443, 3306]),
+            "proto": random.choice(["TCP", "UDP", "ICMP"]),
+            "attack_type": random.choice(SIGNATURES),
+            "category": random.choice(CATEGORIES),
+            "severity": random.randint(1, 3),
+            "signature_id": random.randint(2_000_000, 2_100_000),
+            "country": random.choice(["US", "CN", "RU", "DE", "Unknown"]),
+        })
+    return [dict(store.row(seq), seq=seq) for seq in store.seqs(newest_first=False)]
+
+
+def timed(func, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding and compression of alert payloads")
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(42)
+    payload = {"alerts": synthetic_alerts(args.alerts), "next_cursor": None, "total": args.alerts}
+    print(f"Payload: {args.alerts} alerts")
+
+    candidates = {}
+    try:
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.responses import JSONResponse
+        # What a plain `return {...}` costs: jsonable_encoder walks every value, then json.dumps
+        candidates["fastapi default"] = lambda: JSONResponse(jsonable_encoder(payload)).body
+    except ImportError:
+        print("fastapi not installed; skipping the default response path")
+    for name, encode in reversed(list(ENCODERS.items())):  # stdlib json first as the baseline
+        candidates[name] = lambda encode=encode: encode(payload)
+
+    baseline = None
+    body = None
+    for name, encode in candidates.items():
+        elapsed, body = timed(encode, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:<24} {elapsed * 1000:>9.1f} ms  {len(body) / 1e6:>7.2f} MB  {baseline / elapsed:>5.1f}x")
+
+    raw = ENCODERS[next(iter(ENCODERS))](payload)
+    for name, compress in COMPRESSORS.items():
+        elapsed, compressed = timed(lambda: compress(raw), args.repeat)
+        print(f"{name:<24} {elapsed * 1000:>9.1f} ms  {len(compressed) / 1e6:>7.2f} MB  "
+              f"{len(raw) / len(compressed):>5.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,8 @@
 
 # Paths
 BASE_DIR="$(cd "$(dirname "$0")/.." && pwd)"
+FIREHOL_FILE="$BASE_DIR/datasets/firehol_level1.txt"
 AI_FILE="$BASE_DIR/datasets/ai_block.txt"
-IPSET_NAME="known_bad_ips"
 
 # Check if file exists
 if [ ! -f "$AI_FILE" ]; then
@@ -11,21 +11,11 @@ if [ ! -f "$AI_FILE" ]; then
     exit 1
 fi
 
-# Ensure ipset exists
-sudo ipset list $IPSET_NAME &>/dev/null || sudo ipset create $IPSET_NAME hash:net
-
-# Add each AI-detected IP to ipset
-echo "[+] Adding AI-detected IPs to ipset..."
-while IFS= read -r ip || [ -n "$ip" ]; do
-    ip="${ip%%#*}"           # remove comments
-    ip="$(echo -n "$ip" | xargs)"  # trim spaces
-    [[ -z "$ip" ]] && continue
-    sudo ipset add $IPSET_NAME "$ip" -exist
-done < "$AI_FILE"
-
-# Ensure iptables DROP rule exists
-sudo iptables -C INPUT -m set --match-set $IPSET_NAME src -j DROP 2>/dev/null \
-  || sudo iptables -I INPUT -m set --match-set $IPSET_NAME src -j DROP
-
-echo "[ok] AI-detected IPs added to $IPSET_NAME and iptables."
+# Reload the set as firehol + AI-detected IPs in one atomic ipset transaction;
+# this also ensures the iptables DROP rule exists.
+echo "[+] Syncing AI-detected IPs to ipset..."
+# Fold pending journal records into ai_block.txt first
+python3 "$BASE_DIR/blocklist.py" compact --file "$AI_FILE" > /dev/null
+python3 "$BASE_DIR/firewall.py" sync --sudo --source "$FIREHOL_FILE" --source "$AI_FILE" || exit 1
 
+echo "[ok] AI-detected IPs added to known_bad_ips and iptables."
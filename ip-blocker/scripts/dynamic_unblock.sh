@@ -30,9 +30,8 @@ sudo ipset del "$IPSET_NAME" "$IP" -exist 2>/dev/null || {
     echo "[!] Failed to remove $IP from ipset $IPSET_NAME"
 }
 
-# Remove IP from ai_block.txt
-if grep -Fx "$IP" "$AI_FILE" > /dev/null; then
-    grep -Fxv "$IP" "$AI_FILE" > "${AI_FILE}.tmp" && mv "${AI_FILE}.tmp" "$AI_FILE"
+# Remove IP from ai_block.txt (through the locked journal shared with the API and detector)
+if python3 "$BASE_DIR/blocklist.py" remove "$IP" --file "$AI_FILE" > /dev/null; then
     echo "[ok] Removed $IP from $AI_FILE"
 else
     echo "[!] IP $IP not found in $AI_FILE"
@@ -2,11 +2,13 @@
 IPSET_NAME="known_bad_ips"
 IPSET_CMD="/usr/sbin/ipset"
 IPTABLES_CMD="/usr/sbin/iptables"
+IP6TABLES_CMD="/usr/sbin/ip6tables"
 
-# Remove iptables rule
+# Remove iptables rules
 $IPTABLES_CMD -D INPUT -m set --match-set $IPSET_NAME src -j DROP 2>/dev/null || true
-# Destroy ipset
+$IP6TABLES_CMD -D INPUT -m set --match-set ${IPSET_NAME}6 src -j DROP 2>/dev/null || true
+# Destroy ipsets
 $IPSET_CMD destroy $IPSET_NAME 2>/dev/null || true
+$IPSET_CMD destroy ${IPSET_NAME}6 2>/dev/null || true
 
 echo "[OK] Removed ipset '$IPSET_NAME' and iptables rule"
-
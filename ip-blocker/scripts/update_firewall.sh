@@ -33,6 +33,8 @@ aws network-firewall describe-rule-group \
   --output json > "$TEMP_CURRENT"
 
 echo "[+] Reading new IPs from $NEW_IPS_FILE..."
+# Fold pending journal records into the file first
+python3 /home/ubuntu/idps/ip-blocker/blocklist.py compact --file "$NEW_IPS_FILE" > /dev/null
 # Convert IP list to valid JSON array of {AddressDefinition: "ip"}
 NEW_IPS_JSON=$(awk '!/^#/ && NF {print "{\"AddressDefinition\":\""$0"\"}"}' "$NEW_IPS_FILE" | jq -s '.')
 
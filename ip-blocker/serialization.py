@@ -0,0 +1,92 @@
+import gzip
+import json
+from typing import Callable, Dict, Optional
+
+# Fastest first; each encoder is only listed if it is importable.
+ENCODERS: Dict[str, Callable[[object], bytes]] = {}
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {}
+
+COMPRESS_THRESHOLD = 4096  # bytes; smaller bodies are sent as-is
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4  # higher levels cost far more CPU for a few percent
+
+
+def _default(value):
+    """Pydantic models (and anything else with ``dict()``) are encoded as their fields."""
+    if hasattr(value, "dict"):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+try:
+    import orjson
+    ENCODERS["orjson"] = lambda data: orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    pass
+ENCODERS["json"] = lambda data: json.dumps(
+    data, ensure_ascii=False, separators=(",", ":"), default=_default
+).encode()
+
+try:
+    import brotli
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+except ImportError:
+    pass
+COMPRESSORS["gzip"] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+DEFAULT_ENCODER = next(iter(ENCODERS))
+encode_json = ENCODERS[DEFAULT_ENCODER]
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """The preferred available encoding the client accepts (by q-value, then ours), or None."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for name in COMPRESSORS:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class EncodedBody:
+    """A serialized JSON body and its compressed variants, each built once on first use.
+
+    ``etag`` is the strong validator of the uncompressed body; every variant
+    gets its own (``"<hash>-gzip"``), since they are different representations.
+    """
+
+    __slots__ = ("raw", "etag", "variants")
+
+    def __init__(self, raw: bytes, etag: Optional[str] = None):
+        self.raw = raw
+        self.etag = etag
+        self.variants: Dict[str, bytes] = {}
+
+    def encoding_for(self, accept_encoding: Optional[str], threshold: int = COMPRESS_THRESHOLD) -> Optional[str]:
+        return negotiate(accept_encoding) if len(self.raw) >= threshold else None
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.raw
+        body = self.variants.get(encoding)
+        if body is None:
+            body = self.variants[encoding] = COMPRESSORS[encoding](self.raw)
+        return body
+
+    def etag_for(self, encoding: Optional[str]) -> Optional[str]:
+        if self.etag is None or encoding is None:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
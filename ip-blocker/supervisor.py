@@ -0,0 +1,263 @@
+import os
+import subprocess
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import psutil
+
+SURICATA_PATH = "/usr/bin/suricata"
+SURICATA_CONFIG = "/etc/suricata/suricata.yaml"
+SURICATA_LOG_DIR = "/var/log/suricata/"
+SURICATA_PIDFILE = "/run/suricata.pid"
+
+CHECK_INTERVAL = 1.0
+STARTUP_GRACE = 3.0  # a bad interface or config makes Suricata exit within this
+STOP_TIMEOUT = 10.0
+PIDFILE_SLACK = 1.0  # seconds of clock granularity between a process start and its pidfile write
+MAX_BACKOFF = 60.0
+
+
+class SupervisorError(RuntimeError):
+    pass
+
+
+class SuricataSupervisor:
+    """Tracks one Suricata process by PID instead of scanning the process table.
+
+    The PID comes from the process we spawn or, for an instance started
+    elsewhere (e.g. the systemd unit), from Suricata's pidfile; a pidfile PID is
+    only adopted if it runs our binary and was started before the pidfile was
+    written. Liveness is a check of that PID plus its create time, so a
+    recycled PID is not mistaken for Suricata. A watcher thread notices exits; processes we spawned are
+    restarted with exponential backoff unless they were stopped on purpose.
+    """
+
+    def __init__(
+        self,
+        binary: str = SURICATA_PATH,
+        config: str = SURICATA_CONFIG,
+        log_dir: str = SURICATA_LOG_DIR,
+        pidfile: str = SURICATA_PIDFILE,
+        auto_restart: bool = True,
+        check_interval: float = CHECK_INTERVAL,
+    ):
+        self.binary = binary
+        self.config = config
+        self.log_dir = log_dir
+        self.pidfile = pidfile
+        self.auto_restart = auto_restart
+        self.check_interval = check_interval
+        self.lock = threading.RLock()
+        self.child: Optional[subprocess.Popen] = None
+        self.pid: Optional[int] = None
+        self.create_time: Optional[float] = None
+        self.source: Optional[str] = None  # "child" or "pidfile"
+        self.interface: Optional[str] = None
+        self.wanted = False  # we started it and it should keep running
+        self.started_at: Optional[float] = None
+        self.restarts = 0
+        self.failures = 0
+        self.next_restart = 0.0
+        self.last_exit_code: Optional[int] = None
+        self.last_exit_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- liveness ----------------
+    def _is_suricata(self, proc: psutil.Process) -> bool:
+        try:
+            return os.path.realpath(proc.exe()) == os.path.realpath(self.binary)
+        except psutil.AccessDenied:
+            return proc.name() == os.path.basename(self.binary)
+
+    def _track(self, pid: int, source: str, written_at: float) -> bool:
+        """Adopt ``pid`` if it is our Suricata and older than the pidfile (written at ``written_at``)."""
+        try:
+            proc = psutil.Process(pid)
+            create_time = proc.create_time()
+            if create_time > written_at + PIDFILE_SLACK or not self._is_suricata(proc):
+                return False  # the PID was reused after the pidfile was written
+        except psutil.Error:
+            return False
+        self.pid, self.source = pid, source
+        self.create_time = self.started_at = create_time
+        return True
+
+    def _read_pidfile(self) -> Optional[Tuple[int, float]]:
+        """(PID, modification time) of the pidfile, or None."""
+        try:
+            with open(self.pidfile) as f:
+                return int(f.read().strip()), os.fstat(f.fileno()).st_mtime
+        except (OSError, ValueError):
+            return None
+
+    def _alive(self) -> bool:
+        if self.pid is None:
+            return False
+        if self.child is not None:
+            return self.child.poll() is None
+        try:
+            return psutil.Process(self.pid).create_time() == self.create_time
+        except psutil.Error:
+            return False
+
+    def is_running(self) -> bool:
+        with self.lock:
+            if self.pid is None:
+                entry = self._read_pidfile()
+                if entry is None or not self._track(entry[0], "pidfile", entry[1]):
+                    return False
+            if self._alive():
+                return True
+            self._exited()
+            return False
+
+    def _exited(self):
+        code = self.child.returncode if self.child is not None else None
+        print(f"Suricata (pid {self.pid}) exited" + (f" with {code}" if code is not None else ""))
+        self.last_exit_code = code
+        self.last_exit_at = time.time()
+        self.pid = self.create_time = self.started_at = self.source = None
+        self.child = None
+
+    # ---------------- control ----------------
+    def _spawn(self, interface: str) -> bool:
+        """Start Suricata; False if the pidfile names one that is already running (it is adopted)."""
+        if os.path.exists(self.pidfile):
+            if self.is_running():
+                return False
+            # Suricata refuses to start while a stale pidfile exists
+            try:
+                os.remove(self.pidfile)
+            except OSError:
+                pass
+        self.child = subprocess.Popen(
+            [self.binary, "-i", interface, "-c", self.config, "-l", self.log_dir, "--pidfile", self.pidfile],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        self.pid, self.source, self.interface = self.child.pid, "child", interface
+        self.create_time = psutil.Process(self.child.pid).create_time()
+        self.started_at = time.time()
+        return True
+
+    def start(self, interface: str) -> Dict:
+        with self.lock:
+            if self.is_running() or not self._spawn(interface):
+                return {"message": "Suricata already running.", "pid": self.pid}
+            child = self.child
+        try:
+            code = child.wait(STARTUP_GRACE)
+        except subprocess.TimeoutExpired:
+            with self.lock:
+                self.wanted = True
+                self.failures = 0
+            print(f"Started Suricata on interface {interface} (pid {child.pid})")
+            return {"message": f"Suricata started on interface {interface}", "pid": child.pid}
+        with self.lock:
+            if self.child is child:
+                self._exited()
+        raise SupervisorError(f"Suricata exited with {code}")
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> bool:
+        """Terminate the tracked process (SIGKILL after ``timeout``); False if none was running.
+
+        The lock is only held to signal the process, not while waiting for it
+        to exit, so ``status()`` keeps answering during a slow shutdown.
+        """
+        with self.lock:
+            self.wanted = False
+            if not self.is_running():
+                return False
+            pid, child, proc = self.pid, self.child, None
+            if child is not None:
+                child.terminate()
+            else:
+                try:
+                    proc = psutil.Process(pid)
+                    if proc.create_time() == self.create_time:
+                        proc.terminate()
+                    else:
+                        proc = None  # exited and the PID was reused since the last check
+                except psutil.NoSuchProcess:
+                    proc = None
+        if child is not None:
+            try:
+                child.wait(timeout)
+            except subprocess.TimeoutExpired:
+                child.kill()
+                child.wait()
+        elif proc is not None:
+            try:
+                try:
+                    proc.wait(timeout)
+                except psutil.TimeoutExpired:
+                    proc.kill()
+                    proc.wait(timeout)
+            except psutil.NoSuchProcess:
+                pass
+        with self.lock:
+            if self.pid == pid:  # the watcher may have noticed the exit first
+                self._exited()
+        return True
+
+    # ---------------- watcher ----------------
+    def check(self):
+        """One watcher tick: notice an exit and restart a spawned process that should be running."""
+        with self.lock:
+            if self.pid is not None or not self.wanted:
+                self.is_running()
+            if self.pid is not None or not (self.wanted and self.auto_restart and self.interface):
+                return
+            now = time.monotonic()
+            if not self.next_restart:
+                self.next_restart = now + min(2 ** self.failures, MAX_BACKOFF)
+                return
+            if now < self.next_restart:
+                return
+            self.next_restart = 0.0
+            try:
+                if not self._spawn(self.interface):
+                    return
+            except (OSError, psutil.Error) as e:
+                print(f"Error restarting Suricata: {e}")
+                self.failures += 1
+                return
+            self.restarts += 1
+            self.failures += 1
+            print(f"Restarted Suricata on {self.interface} (pid {self.pid}, restart {self.restarts})")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+                if self.pid is not None and time.time() - (self.started_at or 0) > MAX_BACKOFF:
+                    self.failures = 0  # stayed up long enough; reset the backoff
+            except Exception as e:
+                print(f"Error in Suricata supervisor: {e}")
+            self._stop.wait(self.check_interval)
+
+    def watch(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def unwatch(self):
+        self._stop.set()
+
+    def status(self) -> Dict:
+        with self.lock:
+            running = self.is_running()
+            return {
+                "running": running,
+                "pid": self.pid,
+                "source": self.source,
+                "interface": self.interface if self.source == "child" else None,
+                "uptime": time.time() - self.started_at if running and self.started_at else None,
+                "restarts": self.restarts,
+                "auto_restart": self.auto_restart and self.wanted,
+                "last_exit_code": self.last_exit_code,
+                "last_exit_at": self.last_exit_at,
+            }